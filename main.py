@@ -7,8 +7,6 @@ import subprocess
 import sys
 from pathlib import Path
 import io
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import zipfile
 import json
 import base64
@@ -17,13 +15,63 @@ import time
 import datetime
 
 # Optional OpenCV import (fall back gracefully if not present)
+CV2_CUDA = False
 try:
     import cv2
 except Exception:
     cv2 = None
+else:
+    try:
+        # One-time configuration: make sure the SIMD (SSE/AVX2/NEON) code paths compiled
+        # into the wheel are enabled and let OpenCV's parallel loops use every core
+        cv2.setUseOptimized(True)
+        cv2.setNumThreads(os.cpu_count() or 4)
+    except Exception:
+        pass
+    try:
+        # CUDA-enabled builds can run non-local-means denoise on the GPU
+        CV2_CUDA = cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except Exception:
+        CV2_CUDA = False
+
+# Optional LAN collaboration dependencies (the whiteboard works without them)
+try:
+    import requests
+except Exception:
+    requests = None
+try:
+    import socketio
+except Exception:
+    socketio = None
+
+# Optional zopfli recompression for published (shared) PNGs
+try:
+    import zopfli.png as zopfli_png
+except Exception:
+    zopfli_png = None
+
+# Optional orjson for collaboration pack manifests (falls back to the stdlib json module)
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _json_loads = orjson.loads
+except Exception:
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+    def _json_loads(data):
+        return json.loads(data.decode('utf-8'))
 import threading
 import traceback
 import uuid
+import functools
+import array
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 
 # --- PySide6 Fallback for File Picking (Optional) ---
@@ -58,10 +106,232 @@ def pick_file_with_pyside():
     return file_path
 
 
+def encode_png(img, mode='fast'):
+    """Encode a PIL image to PNG bytes.
+
+    mode='fast' favours encode speed (working exports); mode='share' favours file
+    size for packs published to the community folder, using zopfli when installed.
+    """
+    bio = io.BytesIO()
+    if mode == 'share':
+        img.save(bio, format='PNG', optimize=True, compress_level=9)
+        data = bio.getvalue()
+        if zopfli_png is not None:
+            try:
+                data = zopfli_png.optimize(data)
+            except Exception:
+                pass
+        return data
+    img.save(bio, format='PNG', compress_level=1)
+    return bio.getvalue()
+
+
+def as_rgb(img):
+    """Return img in RGB mode without copying when it already is."""
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def to_uint8(arr):
+    """Saturate an array to uint8 0..255, clipping in place; uint8 input is returned as is."""
+    # cv2 arithmetic on uint8 already saturates, so the common case needs no pass at all
+    if arr.dtype == np.uint8:
+        return arr
+    np.clip(arr, 0, 255, out=arr)
+    return arr.astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=16)
+def _clahe_for(clip):
+    return cv2.createCLAHE(clipLimit=clip, tileGridSize=(8, 8)), threading.Lock()
+
+
+def apply_clahe(plane, clip):
+    """Equalize a uint8 plane with a reusable 8x8-tile CLAHE object for `clip` (rounded to 3 decimals).
+
+    CLAHE objects keep scratch state between apply() calls, and preview/apply/enhancer
+    workers are fresh threads, so one object per clip is shared under a lock.
+    """
+    clahe, lock = _clahe_for(round(float(clip), 3))
+    with lock:
+        return clahe.apply(plane)
+
+
+def clahe_rgb(arr, clip, lab=None, dst=None):
+    """CLAHE the L channel of an RGB uint8 array and return the RGB result.
+
+    lab and dst are optional preallocated buffers for the LAB image and the output
+    (dst may be arr itself). Only the L plane is copied out for CLAHE and written
+    back; a and b stay in the LAB buffer instead of a split/merge of all three planes.
+    """
+    lab = cv2.cvtColor(arr, cv2.COLOR_RGB2LAB, dst=lab)
+    lab[:, :, 0] = apply_clahe(np.ascontiguousarray(lab[:, :, 0]), clip)
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2RGB, dst=dst)
+
+
+def unsharp_inplace(arr, amount, sigma=1.0):
+    """Sharpen a uint8 array in place: arr*(1+amount/2) - blur*(amount/2), saturated."""
+    # GaussianBlur's bit-exact 8-bit path and default border keep the original
+    # output; only the addWeighted result is written back into arr
+    blurred = cv2.GaussianBlur(arr, (0, 0), sigmaX=sigma)
+    cv2.addWeighted(arr, 1.0 + 0.5 * amount, blurred, -0.5 * amount, 0, dst=arr)
+    return arr
+
+
+def process_tiled(arr, fn, tile=1024, overlap=32, check_cancel=None, executor=None):
+    """Apply `fn` to overlapping tiles of `arr` and stitch the tile interiors into a new array.
+
+    `fn` receives a contiguous copy of each tile plus an `overlap`-pixel halo (enough for
+    the NLM search window and the sharpen kernel) and must return an array of the same
+    shape. `check_cancel` is called before every tile. With an `executor`, tiles run
+    concurrently (OpenCV releases the GIL); each writes a disjoint region of the output.
+    """
+    h, w = arr.shape[:2]
+    out = np.empty_like(arr)
+
+    def _tile(y0, x0):
+        if check_cancel is not None:
+            check_cancel()
+        y1, x1 = min(y0 + tile, h), min(x0 + tile, w)
+        hy0, hx0 = max(0, y0 - overlap), max(0, x0 - overlap)
+        hy1, hx1 = min(h, y1 + overlap), min(w, x1 + overlap)
+        res = fn(np.ascontiguousarray(arr[hy0:hy1, hx0:hx1]))
+        out[y0:y1, x0:x1] = res[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0]
+
+    origins = [(y0, x0) for y0 in range(0, h, tile) for x0 in range(0, w, tile)]
+    if executor is None:
+        for y0, x0 in origins:
+            _tile(y0, x0)
+    else:
+        # result() re-raises a worker's exception (including cancellation) here
+        for fut in [executor.submit(_tile, y0, x0) for y0, x0 in origins]:
+            fut.result()
+    return out
+
+
+def denoise_colored(arr, strength):
+    """Non-local-means colour denoise of an RGB uint8 array (GPU when OpenCV has CUDA devices)."""
+    if CV2_CUDA:
+        try:
+            gpu = cv2.cuda_GpuMat()
+            gpu.upload(arr)
+            return cv2.cuda.fastNlMeansDenoisingColored(gpu, float(strength), float(strength), search_window=21, block_size=7).download()
+        except Exception:
+            pass
+    return cv2.fastNlMeansDenoisingColored(arr, None, h=strength, hColor=strength, templateWindowSize=7, searchWindowSize=21)
+
+
+def resize_for_display(img, size):
+    """Resize an RGB image to `size` for on-screen display.
+
+    Downscales use OpenCV's INTER_AREA when available (SIMD, several times faster
+    than Pillow's LANCZOS at display sizes); everything else uses LANCZOS.
+    """
+    if cv2 is not None and size[0] <= img.width and size[1] <= img.height:
+        try:
+            return Image.fromarray(cv2.resize(np.asarray(img), size, interpolation=cv2.INTER_AREA))
+        except Exception:
+            pass
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+
+@functools.lru_cache(maxsize=64)
+def gamma_lut(g):
+    """Return the 256-entry uint8 gamma-correction LUT for exponent 1/g (cached; round g first)."""
+    levels = np.arange(256, dtype=np.float64) / 255.0
+    return np.clip(np.round(np.power(levels, 1.0 / g) * 255.0), 0, 255).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=64)
+def load_font(size, name='DejaVuSans.ttf'):
+    """Return a cached FreeType font, falling back to Pillow's default font (or None)."""
+    try:
+        return ImageFont.truetype(name, size)
+    except Exception:
+        try:
+            return ImageFont.load_default()
+        except Exception:
+            return None
+
+
+# Images above this many pixels run the local (windowed) enhancement stages in tiles
+TILED_MIN_PIXELS = 8_000_000
+
+# ITU-R 601 luma weights for the NumPy grayscale fallback (one dot product per pixel)
+GRAY_WEIGHTS = np.array([0.2989, 0.5870, 0.1140], dtype=np.float32)
+
+
+def gradient_stats(gray, edge_threshold=50):
+    """Return (sharpness, edge_count) of a uint8 gray image without OpenCV.
+
+    Uses int16 forward differences and the L1 magnitude |gx| + |gy|, which is close
+    enough to the Euclidean one for these statistics at a fraction of the memory.
+    """
+    g = gray.astype(np.int16)
+    gx = np.abs(np.diff(g, axis=1)[:-1, :])
+    gy = np.abs(np.diff(g, axis=0)[:, :-1])
+    gx += gy
+    return float(gx.var()), int((gx > edge_threshold).sum())
+
+
+def pillow_luma(arr):
+    """Return convert('L') of an HxWx3 uint8 array, bit-exact with Pillow's fixed-point luma."""
+    lum = arr[..., 0].astype(np.uint32) * 19595
+    lum += arr[..., 1].astype(np.uint32) * 38470
+    lum += arr[..., 2].astype(np.uint32) * 7471
+    lum += 0x8000
+    lum >>= 16
+    return lum.astype(np.uint8)
+
+
+def _apply_lut(arr, lut):
+    """Map a uint8 array through a 256-entry uint8 LUT (in place with OpenCV)."""
+    if cv2 is not None:
+        return cv2.LUT(arr, lut, dst=arr)
+    return lut[arr]
+
+
+def tone_tail(arr, contrast=1.0, color=1.0, g=1.0, check_cancel=None):
+    """Apply ImageEnhance.Contrast, then ImageEnhance.Color, then gamma to an HxWx3 uint8 array.
+
+    Matches the Pillow chain pixel for pixel: contrast blends towards the rounded
+    mean of convert('L'), color towards per-pixel convert('L'), and both truncate
+    like Image.blend. arr may be overwritten; the result array is returned.
+    """
+    if contrast != 1.0:
+        mean = int(pillow_luma(arr).mean() + 0.5)
+        levels = np.arange(256, dtype=np.float32)
+        lut = np.clip(mean + np.float32(contrast) * (levels - mean), 0, 255).astype(np.uint8)
+        arr = _apply_lut(arr, lut)
+    if check_cancel is not None:
+        check_cancel()
+    if color != 1.0:
+        lum = pillow_luma(arr).astype(np.float32)[..., None]
+        blended = arr - lum
+        blended *= np.float32(color)
+        blended += lum
+        np.clip(blended, 0, 255, out=blended)
+        arr = blended.astype(np.uint8)
+    if check_cancel is not None:
+        check_cancel()
+    if g != 1.0:
+        arr = _apply_lut(arr, gamma_lut(round(g, 4)))
+    return arr
+
+
+# Scratch drawing context used only for text measurement
+_MEASURE_DRAW = ImageDraw.Draw(Image.new('L', (1, 1)))
+
+
+@functools.lru_cache(maxsize=2048)
+def measure_text(text, size):
+    """Return the bbox of `text` drawn at the origin with load_font(size) (cached)."""
+    return tuple(_MEASURE_DRAW.textbbox((0, 0), text, font=load_font(size)))
+
+
 class PhotoEditorApp(tk.Tk):
     """
     Advanced Image Editor combining a professional dark UI (Tkinter) 
-    with image processing (Pillow) and local analysis (NumPy, Matplotlib).
+    with image processing (Pillow) and local analysis (NumPy, OpenCV).
     """
     def __init__(self):
         super().__init__()
@@ -104,7 +374,10 @@ class PhotoEditorApp(tk.Tk):
         # --- Image and History State ---
         self.img = None
         self.original_img = None 
-        self.img_history = [] 
+        # Undo ring of at most 10 snapshots. The two newest stay plain images; older ones
+        # are zlib-packed on a worker thread (see push_history)
+        self.img_history = deque(maxlen=10)
+        self._history_executor = None
         # Path to the currently loaded image (if loaded via file dialog)
         self.current_image_path = None
 
@@ -119,10 +392,36 @@ class PhotoEditorApp(tk.Tk):
         self.resize_handles = {} 
         self.resize_handle_size = 10
         self.img_display_box = None # (x1, y1, x2, y2) on canvas
+        self._canvas_to_img_affine = None # ((scale_x, offset_x), (scale_y, offset_y)), set in update_canvas
+        self._canvas_w = 0 # Cached canvas size, refreshed on <Configure>
+        self._canvas_h = 0
+        self._redraw_pending = False # an update_canvas is queued for the next idle
         self.original_img_size_on_canvas = None
         self.original_canvas_mouse_pos = None
         self.current_temp_img = None # Holds the temporary image during slider/resize preview
         self.tk_img_temp = None # Keep a reference for temporary display
+        # Downscaled copy of self.img (~2x canvas) that drives previews; see _get_display_proxy
+        self._display_proxy = None
+        self._display_proxy_src = None
+        self._display_proxy_signature = None
+        self._preview_op = None # (command_type, value) shown by the current slider preview
+        # Advanced enhancer preview: pending after() id and cancel flag of the running worker
+        self._preview_after_id = None
+        self._preview_cancel = None
+        # Thread pool for tiled enhancement, kept across runs (see _get_tile_executor)
+        self._tile_executor = None
+        # Whole-image scratch arrays for the enhancement pipeline (see _scratch)
+        self._scratch_bufs = {}
+        self._scratch_lock = threading.Lock()
+        # Last local CV analysis report, reused while self.img is unchanged
+        self._analysis_cache = {'src': None, 'report': None}
+        # Motion coalescing: only the latest drag event is handled, at most every 16 ms
+        self._pending_resize_event = None
+        self._resize_after_id = None
+        self._pending_crop_event = None
+        self._crop_after_id = None
+        # Full-resolution size the drag-resize will commit to on release
+        self._pending_final_size = None
 
         # --- Adjustment Variables (New Interactive Sliders) ---
         self.flip_var = tk.StringVar(value="Horizontal")
@@ -372,7 +671,7 @@ class PhotoEditorApp(tk.Tk):
                 self.original_img = new_img.copy()
                 self.img = new_img.copy()
                 self.current_image_path = path
-                self.img_history = [self.img.copy()]
+                self.reset_history()
                 self.update_canvas()
                 self.status_label.config(text=f"Image loaded: {os.path.basename(path)}", foreground=self.success_color)
             else:
@@ -598,7 +897,13 @@ class PhotoEditorApp(tk.Tk):
                 self.img = None
                 self.original_img = None
                 self.current_image_path = None
-                self.img_history = []
+                self.img_history.clear()
+                # drop caches that still reference the closed full-resolution image
+                self._display_proxy = None
+                self._display_proxy_src = None
+                self._display_proxy_signature = None
+                self._analysis_cache = {'src': None, 'report': None}
+                self._scratch_bufs.clear()
                 self.canvas.delete('all')
                 self.status_label.config(text='Image closed.', foreground=self.fg_color)
         except Exception as e:
@@ -676,29 +981,64 @@ class PhotoEditorApp(tk.Tk):
         attachments = []  # each: {'img': PIL.Image, 'x':int, 'y':int, 'w':int, 'h':int}
     # collaboration server base url (if connected)
         collab_server_url = None
-        text_objects = []  # each: {'text':str, 'x':int, 'y':int, 'fill':str, 'font':None}
+        collab_http = None  # keep-alive requests.Session shared by collab uploads/downloads
+        text_objects = []  # each: {'text':str, 'x':int, 'y':int, 'fill':str, 'font_size':int} (see make_text_object)
 
         # Drawing state
         draw_color = tk.StringVar(value='#000000')
         pen_width = tk.IntVar(value=4)
         mode_var = tk.StringVar(value='Pen')
-        drawing = {'active': False, 'last': (None, None), 'start': (None, None), 'selected': None, 'offset': (0, 0), 'resize': None}
+        drawing = {'active': False, 'last': (None, None), 'start': (None, None), 'selected': None, 'offset': (0, 0), 'resize': None, 'raster_dirty': False}
 
         # History for undo/redo -- store snapshots containing image + attachments + texts
         wb_history = [{'img': wb_img.copy(), 'attachments': [], 'texts': []}]
         history_index = 0
 
+        def clone_attachment(a):
+            # Attachment bitmaps are never written in place (resizes replace a['img']),
+            # so snapshots share the PIL images copy-on-write and only copy the dict.
+            return {k: v for k, v in a.items() if k != '_resized_cache'}
+
+        def make_text_object(text, x, y, fill='#000000', font_size=20):
+            """Build a text object with every field populated, so render/hit-test loops can index directly."""
+            return {'text': str(text), 'x': int(x), 'y': int(y), 'fill': fill or '#000000', 'font_size': int(font_size)}
+
+        def text_from_dict(t):
+            """Normalize a text dict coming from a pack manifest or a collaborator."""
+            return make_text_object(t.get('text', ''), t.get('x', 0), t.get('y', 0), t.get('fill', '#000000'), t.get('font_size', 20))
+
+        def same_as_head(head, at_copy, txt_copy):
+            """True if the board state matches the current history entry (cheapest checks first)."""
+            if txt_copy != tuple(head['texts']) or len(at_copy) != len(head['attachments']):
+                return False
+            for a, b in zip(at_copy, head['attachments']):
+                if a.get('img') is not b.get('img') or any(a.get(k) != b.get(k) for k in ('x', 'y', 'w', 'h')):
+                    return False
+            # every raster write calls mark_raster_dirty(), so no pixel compare is needed
+            return not drawing['raster_dirty']
+
+        def mark_raster_dirty():
+            """Record that wb_img changed since the last history snapshot."""
+            drawing['raster_dirty'] = True
+
         def push_history():
             nonlocal wb_history, history_index, wb_img, attachments, text_objects
+            # snapshot attachments (images shared) and texts
+            at_copy = [clone_attachment(a) for a in attachments]
+            # texts are flat records, so a tuple per text is enough for the snapshot
+            txt_copy = tuple((t['text'], t['x'], t['y'], t['fill'], t['font_size']) for t in text_objects)
+            # no-op operations (e.g. a Move click without dragging) must not add an entry
+            # or discard the redo stack
+            try:
+                if same_as_head(wb_history[history_index], at_copy, txt_copy):
+                    return
+            except Exception:
+                pass
             # truncate forward history
             wb_history = wb_history[:history_index+1]
-            # deep-copy attachments (images copied) and texts
-            at_copy = []
-            for a in attachments:
-                at_copy.append({'img': a['img'].copy(), 'x': a['x'], 'y': a['y'], 'w': a['w'], 'h': a['h']})
-            txt_copy = [t.copy() for t in text_objects]
             wb_history.append({'img': wb_img.copy(), 'attachments': at_copy, 'texts': txt_copy})
             history_index = len(wb_history) - 1
+            drawing['raster_dirty'] = False
             # limit
             if len(wb_history) > 30:
                 wb_history = wb_history[-30:]
@@ -710,9 +1050,10 @@ class PhotoEditorApp(tk.Tk):
                 history_index -= 1
                 snap = wb_history[history_index]
                 wb_img = snap['img'].copy()
-                attachments = [ {'img':a['img'].copy(), 'x':a['x'], 'y':a['y'], 'w':a['w'], 'h':a['h']} for a in snap['attachments'] ]
-                text_objects = [t.copy() for t in snap['texts']]
+                attachments = [clone_attachment(a) for a in snap['attachments']]
+                text_objects = [make_text_object(*t) for t in snap['texts']]
                 wb_draw = ImageDraw.Draw(wb_img)
+                drawing['raster_dirty'] = False
                 update_preview()
 
         def redo():
@@ -721,11 +1062,42 @@ class PhotoEditorApp(tk.Tk):
                 history_index += 1
                 snap = wb_history[history_index]
                 wb_img = snap['img'].copy()
-                attachments = [ {'img':a['img'].copy(), 'x':a['x'], 'y':a['y'], 'w':a['w'], 'h':a['h']} for a in snap['attachments'] ]
-                text_objects = [t.copy() for t in snap['texts']]
+                attachments = [clone_attachment(a) for a in snap['attachments']]
+                text_objects = [make_text_object(*t) for t in snap['texts']]
                 wb_draw = ImageDraw.Draw(wb_img)
+                drawing['raster_dirty'] = False
                 update_preview()
 
+        def resized_attachment(a, w, h):
+            """Return the attachment bitmap resized from its original to (w, h).
+
+            Results are memoized per attachment in a['_resized_cache'] so repeated
+            redraws/drags at the same size don't re-run LANCZOS. Cached sizes that
+            drift more than 10% from the requested size are evicted.
+            """
+            w, h = max(1, int(w)), max(1, int(h))
+            cache = a.setdefault('_resized_cache', {})
+            for key in [k for k in cache if abs(k[0] - w) > w * 0.1 or abs(k[1] - h) > h * 0.1]:
+                del cache[key]
+            img = cache.get((w, h))
+            if img is None:
+                src = a.get('orig_img', a['img'])
+                try:
+                    img = src.resize((w, h), Image.Resampling.LANCZOS)
+                except Exception:
+                    img = src.resize((w, h))
+                cache[(w, h)] = img
+            return img
+
+        # PixelAccess for the eyedropper, re-acquired only when wb_img is replaced
+        pixel_access = {'img': None, 'px': None}
+
+        def sample_pixel(x, y):
+            if pixel_access['img'] is not wb_img:
+                pixel_access['img'] = wb_img
+                pixel_access['px'] = wb_img.load()
+            return pixel_access['px'][x, y]
+
         def choose_color():
             c = colorchooser.askcolor(title='Choose pen color', color=draw_color.get())
             if c and c[1]:
@@ -754,10 +1126,9 @@ class PhotoEditorApp(tk.Tk):
                 # if connected to collab server, upload the attachment and broadcast its URL
                 try:
                     if collab_server_url and collab_connected:
-                        import requests
                         upload_url = collab_server_url.rstrip('/') + '/upload'
                         with open(p, 'rb') as fh:
-                            resp = requests.post(upload_url, files={'file': fh}, timeout=10)
+                            resp = collab_http.post(upload_url, files={'file': fh}, timeout=10)
                         if resp.status_code in (200, 201):
                             data = resp.json()
                             print('Attachment uploaded to server:', data)
@@ -780,23 +1151,20 @@ class PhotoEditorApp(tk.Tk):
                 # create zip
                 with zipfile.ZipFile(p, 'w', compression=zipfile.ZIP_DEFLATED) as z:
                     # save base image
-                    bio = io.BytesIO()
-                    base.save(bio, format='PNG')
-                    z.writestr('base.png', bio.getvalue())
+                    z.writestr('base.png', encode_png(base, 'fast'))
                     # attachments
                     for i, a in enumerate(attachments):
                         aname = f'attachment_{i}.png'
-                        abio = io.BytesIO()
                         # write original image when possible
                         try:
-                            a.get('orig_img', a['img']).save(abio, format='PNG')
+                            data = encode_png(a.get('orig_img', a['img']), 'fast')
                         except Exception:
-                            a['img'].save(abio, format='PNG')
-                        z.writestr(aname, abio.getvalue())
+                            data = encode_png(a['img'], 'fast')
+                        z.writestr(aname, data)
                         manifest['attachments'].append({'name': aname, 'x': a['x'], 'y': a['y'], 'w': a['w'], 'h': a['h']})
                     # texts
                     for t in text_objects:
-                        manifest['texts'].append({'text': t['text'], 'x': t['x'], 'y': t['y'], 'fill': t.get('fill', '#000000'), 'font_size': t.get('font_size', 20)})
+                        manifest['texts'].append({'text': t['text'], 'x': t['x'], 'y': t['y'], 'fill': t['fill'], 'font_size': t['font_size']})
                     z.writestr('manifest.json', json.dumps(manifest))
                 messagebox.showinfo('Exported', f'Collaboration pack saved: {p}')
             except Exception as e:
@@ -813,13 +1181,14 @@ class PhotoEditorApp(tk.Tk):
                     if 'manifest.json' not in z.namelist():
                         messagebox.showerror('Import Error', 'Invalid collaboration pack (no manifest).')
                         return
-                    manifest = json.loads(z.read('manifest.json').decode('utf-8'))
+                    manifest = _json_loads(z.read('manifest.json'))
                     # load base
                     if 'base.png' in z.namelist():
                         base = Image.open(io.BytesIO(z.read('base.png'))).convert('RGBA')
                         nonlocal wb_img, wb_draw
                         wb_img = base.copy()
                         wb_draw = ImageDraw.Draw(wb_img)
+                        mark_raster_dirty()
                     # load attachments
                     attachments.clear()
                     for a in manifest.get('attachments', []):
@@ -830,7 +1199,7 @@ class PhotoEditorApp(tk.Tk):
                     # load texts
                     text_objects.clear()
                     for t in manifest.get('texts', []):
-                        text_objects.append({'text': t.get('text', ''), 'x': t.get('x', 0), 'y': t.get('y', 0), 'fill': t.get('fill', '#000000'), 'font_size': t.get('font_size', 20)})
+                        text_objects.append(text_from_dict(t))
                     push_history()
                     update_preview()
                 messagebox.showinfo('Imported', 'Collaboration pack loaded.')
@@ -870,9 +1239,13 @@ class PhotoEditorApp(tk.Tk):
 
                 # Compose final image and create a thumbnail
                 full_img = compose_full_image()
-                thumb = full_img.copy()
-                # create a reasonable thumbnail (max 512x512, preserve aspect)
-                thumb.thumbnail((512, 512))
+                # create a reasonable thumbnail (max 512x512, preserve aspect);
+                # small boards are used as-is and BILINEAR is plenty for a preview
+                if max(full_img.size) <= 512:
+                    thumb = full_img
+                else:
+                    thumb = full_img.copy()
+                    thumb.thumbnail((512, 512), Image.Resampling.BILINEAR)
 
                 # Build manifest with metadata
                 manifest = {
@@ -888,15 +1261,11 @@ class PhotoEditorApp(tk.Tk):
                 with zipfile.ZipFile(fname, 'w', compression=zipfile.ZIP_DEFLATED) as z:
                     # base image
                     base = full_img.convert('RGBA')
-                    bio = io.BytesIO()
-                    base.save(bio, format='PNG')
-                    z.writestr('base.png', bio.getvalue())
+                    z.writestr('base.png', encode_png(base, 'share'))
 
                     # thumbnail
-                    tbio = io.BytesIO()
                     try:
-                        thumb.save(tbio, format='PNG')
-                        z.writestr('thumbnail.png', tbio.getvalue())
+                        z.writestr('thumbnail.png', encode_png(thumb, 'share'))
                         manifest['thumbnail'] = 'thumbnail.png'
                     except Exception:
                         # ignore thumbnail generation issues
@@ -905,24 +1274,23 @@ class PhotoEditorApp(tk.Tk):
                     # attachments
                     for i, a in enumerate(attachments):
                         aname = f'attachment_{i}.png'
-                        abio = io.BytesIO()
                         try:
-                            a.get('orig_img', a['img']).save(abio, format='PNG')
+                            data = encode_png(a.get('orig_img', a['img']), 'share')
                         except Exception:
                             try:
-                                a['img'].save(abio, format='PNG')
+                                data = encode_png(a['img'], 'share')
                             except Exception:
-                                abio = None
-                        if abio is not None:
-                            z.writestr(aname, abio.getvalue())
+                                data = None
+                        if data is not None:
+                            z.writestr(aname, data)
                             manifest['attachments'].append({'name': aname, 'x': a.get('x', 0), 'y': a.get('y', 0), 'w': a.get('w', a.get('img').width if a.get('img') is not None else 0), 'h': a.get('h', a.get('img').height if a.get('img') is not None else 0)})
 
                     # texts
                     for t in text_objects:
-                        manifest['texts'].append({'text': t.get('text', ''), 'x': t.get('x', 0), 'y': t.get('y', 0), 'fill': t.get('fill', '#000000'), 'font_size': t.get('font_size', 20)})
+                        manifest['texts'].append({'text': t['text'], 'x': t['x'], 'y': t['y'], 'fill': t['fill'], 'font_size': t['font_size']})
 
                     # write manifest
-                    z.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+                    z.writestr('manifest.json', _json_dumps(manifest))
 
                 # open community folder for user convenience
                 try:
@@ -947,6 +1315,16 @@ class PhotoEditorApp(tk.Tk):
         collab_connected = False
         collab_status_var = tk.StringVar(value='Collab: Disconnected')
 
+        def fetch_remote_image(url):
+            """Download an attachment from the collab server; returns an RGBA image or None."""
+            if url.startswith('/'):
+                url = collab_server_url.rstrip('/') + url
+            r = collab_http.get(url, timeout=8)
+            if r.status_code != 200:
+                return None
+            print('Fetched attachment from server:', url)
+            return Image.open(io.BytesIO(r.content)).convert('RGBA')
+
         def emit_collab_operation(op_type, payload):
             nonlocal collab_sio, collab_connected
             try:
@@ -957,22 +1335,22 @@ class PhotoEditorApp(tk.Tk):
 
         def connect_collab():
             """Prompt for server URL and start a Socket.IO client in background."""
-            nonlocal collab_sio, collab_thread, collab_connected, collab_server_url
+            nonlocal collab_sio, collab_thread, collab_connected, collab_server_url, collab_http
             server = simpledialog.askstring('Connect', 'Collab server URL (e.g. http://127.0.0.1:5001):', initialvalue='http://127.0.0.1:5001')
             if not server:
                 return
-            try:
-                import socketio as _sio
-            except Exception:
+            if socketio is None:
                 messagebox.showerror('Dependency Error', 'python-socketio is required. Install with: pip install python-socketio[client]')
                 return
 
-            sio = _sio.Client()
+            sio = socketio.Client()
             # remember the server base URL for uploads
             try:
                 collab_server_url = server
             except Exception:
                 pass
+            # one keep-alive session for all attachment transfers (avoids a TCP/TLS handshake per request)
+            collab_http = requests.Session() if requests is not None else None
 
             @sio.event
             def connect():
@@ -996,6 +1374,19 @@ class PhotoEditorApp(tk.Tk):
 
             @sio.on('init_state')
             def on_init_state(state):
+                # fetch remote attachments in parallel on this (Socket.IO) thread so the
+                # Tk thread only has to apply the already-decoded images
+                remote = [a for a in state.get('attachments', []) if isinstance(a, dict) and a.get('url')]
+                fetched = {}
+                if remote:
+                    with ThreadPoolExecutor(max_workers=4) as pool:
+                        futures = {id(a): pool.submit(fetch_remote_image, a['url']) for a in remote}
+                    for key, fut in futures.items():
+                        try:
+                            fetched[key] = fut.result()
+                        except Exception:
+                            fetched[key] = None
+
                 # apply canonical state (strokes, attachments, texts)
                 def _apply():
                     try:
@@ -1004,32 +1395,23 @@ class PhotoEditorApp(tk.Tk):
                             if pts:
                                 try:
                                     wb_draw.line([tuple(p) for p in pts], fill=s.get('color', '#000000'), width=int(s.get('width', 4)))
+                                    mark_raster_dirty()
                                 except Exception:
                                     pass
-                        # attachments: if remote URL provided, fetch it from server and attach
+                        # attachments: use the image fetched from the server when a URL was provided
                         for a in state.get('attachments', []):
                             try:
-                                if isinstance(a, dict) and a.get('url'):
-                                    # construct full url
-                                    url = a.get('url')
-                                    if url.startswith('/'):
-                                        base = server.rstrip('/')
-                                        url = base + url
-                                    import requests
-                                    r = requests.get(url, timeout=8)
-                                    if r.status_code == 200:
-                                        from io import BytesIO
-                                        img = Image.open(BytesIO(r.content)).convert('RGBA')
-                                        aw, ah = img.size
-                                        attachments.append({'img': img, 'orig_img': img.copy(), 'x': a.get('x', 50), 'y': a.get('y', 50), 'w': a.get('w', aw), 'h': a.get('h', ah)})
-                                        print('Fetched attachment from server (init_state):', url)
-                                        continue
+                                img = fetched.get(id(a))
+                                if img is not None:
+                                    aw, ah = img.size
+                                    attachments.append({'img': img, 'orig_img': img.copy(), 'x': a.get('x', 50), 'y': a.get('y', 50), 'w': a.get('w', aw), 'h': a.get('h', ah)})
+                                    continue
                                 # fallback: append raw metadata (may be reconstructed later)
                                 attachments.append(a)
                             except Exception:
                                 attachments.append(a)
                         for t in state.get('texts', []):
-                            text_objects.append(t)
+                            text_objects.append(text_from_dict(t))
                         push_history()
                         update_preview()
                     except Exception:
@@ -1038,6 +1420,15 @@ class PhotoEditorApp(tk.Tk):
 
             @sio.on('operation')
             def on_operation(data):
+                # download attachment images here rather than on the Tk thread
+                fetched = None
+                p0 = data.get('payload', {})
+                if data.get('type') == 'attach' and isinstance(p0, dict) and p0.get('url'):
+                    try:
+                        fetched = fetch_remote_image(p0['url'])
+                    except Exception:
+                        fetched = None
+
                 def _apply():
                     try:
                         t = data.get('type')
@@ -1047,34 +1438,21 @@ class PhotoEditorApp(tk.Tk):
                             if pts:
                                 try:
                                     wb_draw.line([tuple(x) for x in pts], fill=p.get('color', '#000000'), width=int(p.get('width', 4)))
+                                    mark_raster_dirty()
                                 except Exception:
                                     pass
                         elif t == 'attach':
-                            # if operation provides a URL, fetch and append image
+                            # if the operation provided a URL, the image was fetched above
                             try:
-                                if isinstance(p, dict) and p.get('url'):
-                                    url = p.get('url')
-                                    if url.startswith('/'):
-                                        base = server.rstrip('/')
-                                        url = base + url
-                                    import requests
-                                    from io import BytesIO
-                                    r = requests.get(url, timeout=8)
-                                    if r.status_code == 200:
-                                        img = Image.open(BytesIO(r.content)).convert('RGBA')
-                                        aw, ah = img.size
-                                        attachments.append({'id': p.get('id'), 'img': img, 'orig_img': img.copy(), 'x': p.get('x', 50), 'y': p.get('y', 50), 'w': p.get('w', aw), 'h': p.get('h', ah)})
-                                        print('Fetched attachment from server (operation):', url)
-                                        # done
-                                        pass
-                                    else:
-                                        attachments.append(p)
+                                if fetched is not None:
+                                    aw, ah = fetched.size
+                                    attachments.append({'id': p.get('id'), 'img': fetched, 'orig_img': fetched.copy(), 'x': p.get('x', 50), 'y': p.get('y', 50), 'w': p.get('w', aw), 'h': p.get('h', ah)})
                                 else:
                                     attachments.append(p)
                             except Exception:
                                 attachments.append(p)
                         elif t == 'text':
-                            text_objects.append(p)
+                            text_objects.append(text_from_dict(p))
                         push_history()
                         update_preview()
                     except Exception:
@@ -1129,12 +1507,18 @@ class PhotoEditorApp(tk.Tk):
         def clear_board():
             wb_canvas.delete('all')
             nonlocal wb_img, wb_draw, wb_history, history_index, attachments, text_objects
-            wb_img = Image.new('RGBA', (CANVAS_W, CANVAS_H), (255, 255, 255, 0))
-            wb_draw = ImageDraw.Draw(wb_img)
+            if wb_img.size == (CANVAS_W, CANVAS_H) and wb_img.mode == 'RGBA':
+                # same shape: clear the existing buffer in place and keep wb_draw
+                # (history snapshots hold their own copies, so this is safe)
+                wb_img.paste((255, 255, 255, 0), (0, 0, CANVAS_W, CANVAS_H))
+            else:
+                wb_img = Image.new('RGBA', (CANVAS_W, CANVAS_H), (255, 255, 255, 0))
+                wb_draw = ImageDraw.Draw(wb_img)
             attachments = []
             text_objects = []
             wb_history = [{'img': wb_img.copy(), 'attachments': [], 'texts': []}]
             history_index = 0
+            drawing['raster_dirty'] = False
             update_preview()
 
         def save_board():
@@ -1152,90 +1536,237 @@ class PhotoEditorApp(tk.Tk):
             except Exception as e:
                 messagebox.showerror('Save Error', f'Failed to save whiteboard: {e}')
 
-        def compose_full_image(src=None):
-            """Return a new PIL RGBA image that composites wb_img + attachments + texts."""
-            _src = src if src is not None else wb_img
-            out = _src.copy().convert('RGBA')
+        def composite_objects(out, origin=(0, 0)):
+            """Draw attachments and texts onto the RGBA image `out` in place.
+
+            `origin` is the board position of out's top-left pixel, so a cropped
+            region of the board can be composited on its own.
+            """
+            ox, oy = origin
+            # an object being dragged is shown as a canvas sprite instead (see start_drag_sprite)
+            hidden = drawing.get('drag_hidden')
             # draw attachments
-            for a in attachments:
+            for i, a in enumerate(attachments):
+                if hidden == ('attach', i):
+                    continue
                 try:
-                    out.paste(a['img'], (int(a['x']), int(a['y'])), a['img'])
+                    out.paste(a['img'], (int(a['x']) - ox, int(a['y']) - oy), a['img'])
                 except Exception:
                     try:
-                        out.paste(a['img'], (int(a['x']), int(a['y'])))
+                        out.paste(a['img'], (int(a['x']) - ox, int(a['y']) - oy))
                     except Exception:
                         pass
             # draw texts
             draw_tmp = ImageDraw.Draw(out)
-            for t in text_objects:
+            # texts usually share a size, so look the font up only when the size changes
+            font_size, font = None, None
+            for i, t in enumerate(text_objects):
+                if hidden == ('text', i):
+                    continue
                 try:
-                    fsize = int(t.get('font_size', 20))
-                    try:
-                        font = ImageFont.truetype('DejaVuSans.ttf', fsize)
-                    except Exception:
-                        try:
-                            font = ImageFont.load_default()
-                        except Exception:
-                            font = None
+                    if t['font_size'] != font_size:
+                        font_size = t['font_size']
+                        font = load_font(font_size)
                     if font is not None:
-                        draw_tmp.text((t['x'], t['y']), t['text'], fill=t.get('fill', '#000000'), font=font)
+                        draw_tmp.text((t['x'] - ox, t['y'] - oy), t['text'], fill=t['fill'], font=font)
                     else:
-                        draw_tmp.text((t['x'], t['y']), t['text'], fill=t.get('fill', '#000000'))
+                        draw_tmp.text((t['x'] - ox, t['y'] - oy), t['text'], fill=t['fill'])
                 except Exception:
                     pass
+
+        def compose_full_image(src=None):
+            """Return a new PIL RGBA image that composites wb_img + attachments + texts."""
+            _src = src if src is not None else wb_img
+            # exactly one full-canvas allocation per call (convert() already copies)
+            out = _src.copy() if _src.mode == 'RGBA' else _src.convert('RGBA')
+            composite_objects(out)
             return out
 
-        def update_preview(img=None):
-            """Update the canvas display from the backing PIL image (or provided image)."""
-            nonlocal wb_canvas
-            _src = img if img is not None else wb_img
-            try:
-                disp = compose_full_image(_src)
-                # Convert to a PhotoImage and display at top-left
-                tkimg = ImageTk.PhotoImage(disp)
-                wb_canvas.delete('all')
-                wb_canvas.create_image(0, 0, image=tkimg, anchor='nw', tags=('wb_image',))
-                wb_canvas.image = tkimg
-                # draw selection overlay (rectangle + handles) on top using canvas primitives
+        # Pooled RGBA buffer for on-screen redraws (PhotoImage copies it, so it can be reused)
+        preview_pool = {'img': None}
+
+        def compose_preview():
+            """Composite wb_img + objects into the pooled preview buffer and return it."""
+            buf = preview_pool['img']
+            if buf is None or buf.size != wb_img.size:
+                buf = preview_pool['img'] = Image.new('RGBA', wb_img.size)
+            buf.paste(wb_img if wb_img.mode == 'RGBA' else wb_img.convert('RGBA'), (0, 0))
+            composite_objects(buf)
+            return buf
+
+        def object_bbox(kind, idx):
+            """Board-space bbox of an attachment or text object."""
+            if kind == 'attach':
+                a = attachments[idx]
+                return (int(a['x']), int(a['y']), int(a['x'] + a['w']), int(a['y'] + a['h']))
+            return text_bbox(text_objects[idx])
+
+        def object_corners(kind, idx):
+            """Corner handle positions of an object, cached on it until its bbox changes."""
+            obj = attachments[idx] if kind == 'attach' else text_objects[idx]
+            bbox = object_bbox(kind, idx)
+            if obj.get('_corners_key') != bbox:
+                x0, y0, x1, y1 = bbox
+                obj['_corners'] = ((x0, y0, 'nw'), (x1, y0, 'ne'), (x0, y1, 'sw'), (x1, y1, 'se'))
+                obj['_corners_key'] = bbox
+            return obj['_corners']
+
+        def union_bbox(b0, b1):
+            return (min(b0[0], b1[0]), min(b0[1], b1[1]), max(b0[2], b1[2]), max(b0[3], b1[3]))
+
+        # --- Hit testing: a uniform grid of 32x32 px cells over object bboxes ---
+        HIT_CELL_SHIFT = 5
+        hit_index = {'valid': False, 'cells': {}}
+
+        def text_bbox(t):
+            """Return the rendered bbox of a text object, cached on it until text/position/size change."""
+            key = (t['text'], t['x'], t['y'], t['font_size'])
+            if t.get('_bbox_key') != key:
                 try:
-                    wb_canvas.delete('wb_sel')
+                    # measured once per (text, size) at the origin, then offset to the position
+                    bx0, by0, bx1, by1 = measure_text(t['text'], t['font_size'])
+                    t['_bbox'] = (t['x'] + bx0, t['y'] + by0, t['x'] + bx1, t['y'] + by1)
                 except Exception:
-                    pass
-                sel = drawing.get('selected') if isinstance(drawing, dict) else None
-                resize_sel = drawing.get('resize') if isinstance(drawing, dict) else None
-                handle_size = 6
-                target = sel or (resize_sel and (resize_sel[0], resize_sel[1]))
-                if target:
-                    typ, idx = target
-                    if typ == 'attach' and 0 <= idx < len(attachments):
-                        a = attachments[idx]
-                        x0, y0 = int(a['x']), int(a['y'])
-                        x1, y1 = int(a['x'] + a['w']), int(a['y'] + a['h'])
-                    elif typ == 'text' and 0 <= idx < len(text_objects):
-                        t = text_objects[idx]
-                        try:
-                            fsize = int(t.get('font_size', 20))
-                            try:
-                                font = ImageFont.truetype('DejaVuSans.ttf', fsize)
-                            except Exception:
-                                font = ImageFont.load_default()
-                            bbox = ImageDraw.Draw(wb_img).textbbox((t['x'], t['y']), t['text'], font=font)
-                            x0, y0, x1, y1 = bbox
-                        except Exception:
-                            x0, y0 = int(t['x']) - 4, int(t['y']) - 4
-                            x1, y1 = int(t['x']) + 4, int(t['y']) + 4
-                    else:
-                        x0 = y0 = x1 = y1 = None
-
-                    if x0 is not None:
-                        # selection rectangle
-                        wb_canvas.create_rectangle(x0, y0, x1, y1, outline='#2b8cff', width=2, tags=('wb_sel',))
-                        # handles
-                        for hx, hy in ((x0, y0), (x1, y0), (x0, y1), (x1, y1)):
-                            wb_canvas.create_rectangle(hx-handle_size, hy-handle_size, hx+handle_size, hy+handle_size, fill='white', outline='#2b8cff', tags=('wb_sel',))
+                    # fallback: small area around the text origin
+                    t['_bbox'] = (t['x'] - 10, t['y'] - 10, t['x'] + 10, t['y'] + 10)
+                t['_bbox_key'] = key
+            return t['_bbox']
+
+        def invalidate_hit_index():
+            hit_index['valid'] = False
+
+        def build_hit_index():
+            """Bucket every object's bbox into grid cells, topmost first (attachments above texts)."""
+            cells = {}
+
+            def _add(z, kind, idx, bbox):
+                x0, y0, x1, y1 = (int(v) for v in bbox)
+                for cx in range(x0 >> HIT_CELL_SHIFT, (x1 >> HIT_CELL_SHIFT) + 1):
+                    for cy in range(y0 >> HIT_CELL_SHIFT, (y1 >> HIT_CELL_SHIFT) + 1):
+                        cells.setdefault((cx, cy), []).append((z, kind, idx, bbox))
+
+            for i, t in enumerate(text_objects):
+                _add(i, 'text', i, text_bbox(t))
+            for i, a in enumerate(attachments):
+                try:
+                    bbox = (a['x'], a['y'], a['x'] + a['w'], a['y'] + a['h'])
+                except Exception:
+                    continue  # raw collab metadata without geometry
+                _add(len(text_objects) + i, 'attach', i, bbox)
+            for entries in cells.values():
+                entries.sort(key=lambda e: e[0], reverse=True)
+            hit_index['cells'] = cells
+            hit_index['valid'] = True
+
+        def hit_test(x, y, kinds=('attach', 'text')):
+            """Return (kind, idx) of the topmost object under (x, y), or None."""
+            if not hit_index['valid']:
+                build_hit_index()
+            for _z, kind, idx, (x0, y0, x1, y1) in hit_index['cells'].get((x >> HIT_CELL_SHIFT, y >> HIT_CELL_SHIFT), ()):
+                if kind in kinds and x0 <= x <= x1 and y0 <= y <= y1:
+                    return (kind, idx)
+            return None
+
+        def draw_selection_overlay():
+            """Draw the selection rectangle + handles on top using canvas primitives."""
+            try:
+                wb_canvas.delete('wb_sel')
+            except Exception:
+                pass
+            sel = drawing.get('selected') if isinstance(drawing, dict) else None
+            resize_sel = drawing.get('resize') if isinstance(drawing, dict) else None
+            handle_size = 6
+            target = sel or (resize_sel and (resize_sel[0], resize_sel[1]))
+            if target:
+                typ, idx = target
+                if (typ == 'attach' and 0 <= idx < len(attachments)) or (typ == 'text' and 0 <= idx < len(text_objects)):
+                    x0, y0, x1, y1 = object_bbox(typ, idx)
+                    # selection rectangle
+                    wb_canvas.create_rectangle(x0, y0, x1, y1, outline='#2b8cff', width=2, tags=('wb_sel',))
+                    # handles
+                    for hx, hy in ((x0, y0), (x1, y0), (x0, y1), (x1, y1)):
+                        wb_canvas.create_rectangle(hx-handle_size, hy-handle_size, hx+handle_size, hy+handle_size, fill='white', outline='#2b8cff', tags=('wb_sel',))
+
+        # Redraw requests are coalesced: update_preview only records what changed and
+        # render_preview runs once per Tk idle with the accumulated full/damage state
+        preview_sched = {'pending': False, 'full': False, 'damage': None}
+
+        def update_preview(damage=None):
+            """Schedule a canvas redraw from the backing PIL image.
+
+            `damage` is an optional (x0, y0, x1, y1) board rect; when every request since
+            the last render carried one, only their union is re-composited and re-uploaded.
+            """
+            # every scene change ends in a redraw, so this is where cached hit boxes go stale
+            invalidate_hit_index()
+            if damage is None:
+                preview_sched['full'] = True
+            else:
+                cur = preview_sched['damage']
+                preview_sched['damage'] = damage if cur is None else union_bbox(cur, damage)
+            if not preview_sched['pending']:
+                preview_sched['pending'] = True
+                wb_canvas.after_idle(render_preview)
+
+        def render_preview():
+            full, damage = preview_sched['full'], preview_sched['damage']
+            preview_sched.update(pending=False, full=False, damage=None)
+            try:
+                buf = preview_pool['img']
+                if (not full and damage is not None and buf is not None
+                        and buf.size == wb_img.size and getattr(wb_canvas, 'image', None) is not None):
+                    x0, y0 = max(0, int(damage[0])), max(0, int(damage[1]))
+                    x1, y1 = min(buf.width, int(damage[2])), min(buf.height, int(damage[3]))
+                    if x1 > x0 and y1 > y0:
+                        tile = wb_img.crop((x0, y0, x1, y1))
+                        if tile.mode != 'RGBA':
+                            tile = tile.convert('RGBA')
+                        composite_objects(tile, origin=(x0, y0))
+                        buf.paste(tile, (x0, y0))
+                        patch = ImageTk.PhotoImage(tile)
+                        # 'set' replaces pixels (incl. alpha) instead of blending over them
+                        wb_canvas.tk.call(str(wb_canvas.image), 'copy', str(patch), '-to', x0, y0, '-compositingrule', 'set')
+                    draw_selection_overlay()
+                    return
+                disp = compose_preview()
+                # Reuse the canvas PhotoImage in place while the board size is unchanged;
+                # a new one is only allocated after a resize
+                tkimg = getattr(wb_canvas, 'image', None)
+                if tkimg is not None and (tkimg.width(), tkimg.height()) == disp.size:
+                    tkimg.paste(disp)
+                else:
+                    tkimg = ImageTk.PhotoImage(disp)
+                    wb_canvas.image = tkimg
+                if wb_canvas.find_withtag('wb_image'):
+                    wb_canvas.itemconfigure('wb_image', image=tkimg)
+                else:
+                    wb_canvas.create_image(0, 0, image=tkimg, anchor='nw', tags=('wb_image',))
+                draw_selection_overlay()
             except Exception:
                 pass
 
+        # Pen/Eraser samples arrive faster than frames; collect their segments and damage,
+        # then rasterize and redraw once per idle
+        pen_dirty = {'rect': None, 'pending': False, 'pts': [], 'fill': None, 'width': 1}
+
+        def flush_pen_preview():
+            """Draw all pending pen segments as one polyline and redraw their damage."""
+            pen_dirty['pending'] = False
+            pts, pen_dirty['pts'] = pen_dirty['pts'], []
+            if len(pts) >= 4:
+                wb_draw.line(pts, fill=pen_dirty['fill'], width=pen_dirty['width'])
+                mark_raster_dirty()
+            rect, pen_dirty['rect'] = pen_dirty['rect'], None
+            if rect is not None:
+                update_preview(damage=rect)
+
+        def mark_pen_dirty(rect):
+            cur = pen_dirty['rect']
+            pen_dirty['rect'] = rect if cur is None else union_bbox(cur, rect)
+            if not pen_dirty['pending']:
+                pen_dirty['pending'] = True
+                wb_canvas.after_idle(flush_pen_preview)
+
         def insert_to_editor():
             # Insert the whiteboard drawing into the main editor.
             try:
@@ -1244,14 +1775,15 @@ class PhotoEditorApp(tk.Tk):
                     self.push_history()
                     self.img = wb_img.convert('RGB')
                     self.original_img = self.img.copy()
-                    self.img_history = [self.img.copy()]
+                    self.reset_history()
                     self.update_canvas()
                     self.status_label.config(text='Whiteboard inserted as new image.', foreground=self.success_color)
                     wb.destroy()
                     return
 
                 # Otherwise, composite the drawing over the current image, centered
-                base = self.img.copy().convert('RGBA')
+                # convert() already returns a new image, so no extra copy is needed
+                base = self.img.convert('RGBA')
                 # Compose full whiteboard (wb_img + attachments + texts)
                 full = compose_full_image()
                 # Resize drawing to fit base if sizes differ
@@ -1260,9 +1792,10 @@ class PhotoEditorApp(tk.Tk):
                 else:
                     overlay = full
 
-                composed = Image.alpha_composite(base, overlay)
+                # composite in place on the private base buffer
+                base.alpha_composite(overlay)
                 self.push_history()
-                self.img = composed.convert('RGB')
+                self.img = base.convert('RGB')
                 self.update_canvas()
                 self.status_label.config(text='Whiteboard inserted into current image.', foreground=self.success_color)
                 wb.destroy()
@@ -1270,15 +1803,60 @@ class PhotoEditorApp(tk.Tk):
                 messagebox.showerror('Insert Error', f'Failed to insert whiteboard: {e}')
 
         # Drawing handlers
+        def start_drag_sprite(sel):
+            """Lift the selected object off the board into its own canvas image item.
+
+            While dragging, only the item is moved with canvas coords; the object is
+            composited back into the board preview once on release.
+            """
+            try:
+                x0, y0, x1, y1 = object_bbox(*sel)
+                if sel[0] == 'attach':
+                    sprite = attachments[sel[1]]['img']
+                else:
+                    t = text_objects[sel[1]]
+                    sprite = Image.new('RGBA', (max(1, x1 - x0), max(1, y1 - y0)), (0, 0, 0, 0))
+                    font = load_font(t['font_size'])
+                    if font is not None:
+                        ImageDraw.Draw(sprite).text((t['x'] - x0, t['y'] - y0), t['text'], fill=t['fill'], font=font)
+                    else:
+                        ImageDraw.Draw(sprite).text((t['x'] - x0, t['y'] - y0), t['text'], fill=t['fill'])
+                photo = ImageTk.PhotoImage(sprite)
+                wb_canvas.delete('wb_drag_sprite')
+                wb_canvas.create_image(x0, y0, image=photo, anchor='nw', tags=('wb_drag_sprite',))
+                wb_canvas._drag_sprite = photo
+                drawing['drag_hidden'] = sel
+                drawing['drag_pos'] = (x0, y0)
+                # take the object out of the board image
+                update_preview(damage=(x0, y0, x1 + 1, y1 + 1))
+            except Exception:
+                drawing['drag_hidden'] = None
+
+        def end_drag_sprite():
+            """Drop the drag sprite and composite the object back at its final position."""
+            sel = drawing.pop('drag_hidden', None)
+            drawing.pop('drag_pos', None)
+            wb_canvas.delete('wb_drag_sprite')
+            wb_canvas._drag_sprite = None
+            if sel is not None:
+                x0, y0, x1, y1 = object_bbox(*sel)
+                update_preview(damage=(x0, y0, x1 + 1, y1 + 1))
+
+        # minimum spacing of non-pen motion handling (~120 Hz)
+        MOTION_INTERVAL = 1.0 / 120
+
         def on_down(ev):
             drawing['start'] = (ev.x, ev.y)
             drawing['last'] = (ev.x, ev.y)
             drawing['active'] = True
+            # snapshot the Tk vars once per gesture; on_move/on_up read the plain values
+            drawing['_w'] = pen_width.get()
+            drawing['_c'] = draw_color.get()
             m = mode_var.get()
             if m == 'Eyedropper':
                 # sample color from image
                 try:
-                    px = wb_img.getpixel((int(ev.x), int(ev.y)))
+                    px = sample_pixel(int(ev.x), int(ev.y))
                     if isinstance(px, tuple):
                         # convert to hex
                         r, g, b = px[:3]
@@ -1293,69 +1871,23 @@ class PhotoEditorApp(tk.Tk):
                     try:
                         # create a movable text object instead of drawing directly
                         # default font size
-                        text_objects.append({'text': txt, 'x': ev.x, 'y': ev.y, 'fill': draw_color.get(), 'font': None, 'font_size': 20})
+                        text_objects.append(make_text_object(txt, ev.x, ev.y, drawing['_c']))
                         push_history()
                         update_preview()
                     except Exception as e:
                         messagebox.showerror('Text Error', str(e))
                 drawing['active'] = False
             elif m == 'Move':
-                # select topmost attachment or text under cursor
-                sel = None
-                # attachments: check from topmost (last) to bottom
-                for i in range(len(attachments)-1, -1, -1):
-                    a = attachments[i]
-                    if ev.x >= a['x'] and ev.x <= a['x'] + a['w'] and ev.y >= a['y'] and ev.y <= a['y'] + a['h']:
-                        sel = ('attach', i)
-                        break
-                if sel is None:
-                    # check text objects using the same font metrics used for rendering
-                    for i in range(len(text_objects)-1, -1, -1):
-                        t = text_objects[i]
-                        try:
-                            fsize = int(t.get('font_size', 20))
-                            try:
-                                font = ImageFont.truetype('DejaVuSans.ttf', fsize)
-                            except Exception:
-                                font = ImageFont.load_default()
-                            bbox = ImageDraw.Draw(wb_img).textbbox((t['x'], t['y']), t['text'], font=font)
-                            x0, y0, x1, y1 = bbox
-                            if ev.x >= x0 and ev.x <= x1 and ev.y >= y0 and ev.y <= y1:
-                                sel = ('text', i)
-                                break
-                        except Exception:
-                            # fallback: simple point check near text origin
-                            if abs(ev.x - t['x']) < 10 and abs(ev.y - t['y']) < 10:
-                                sel = ('text', i)
-                                break
+                # select topmost attachment or text under cursor (grid lookup, cached text bboxes)
+                sel = hit_test(ev.x, ev.y)
                 if sel:
                     # determine if click landed on a resize handle (corners)
-                    handle_hit = None
-                    handle_size = 8
-                    if sel[0] == 'attach':
-                        obj = attachments[sel[1]]
-                        cx, cy = obj['x'], obj['y']
-                        w, h = obj['w'], obj['h']
-                        corners = {'nw': (cx, cy), 'ne': (cx + w, cy), 'sw': (cx, cy + h), 'se': (cx + w, cy + h)}
-                        for name, (hx, hy) in corners.items():
-                            if abs(ev.x - hx) <= handle_size and abs(ev.y - hy) <= handle_size:
-                                handle_hit = ('attach', sel[1], name)
-                                break
-                    else:
-                        obj = text_objects[sel[1]]
-                        # approximate bbox for text selection
-                        try:
-                            bbox = ImageDraw.Draw(wb_img).textbbox((obj['x'], obj['y']), obj['text'])
-                            x0, y0, x1, y1 = bbox
-                            corners = {'nw': (x0, y0), 'ne': (x1, y0), 'sw': (x0, y1), 'se': (x1, y1)}
-                            for name, (hx, hy) in corners.items():
-                                if abs(ev.x - hx) <= handle_size and abs(ev.y - hy) <= handle_size:
-                                    handle_hit = ('text', sel[1], name)
-                                    break
-                        except Exception:
-                            # fallback: small area around origin
-                            if abs(ev.x - obj['x']) <= handle_size and abs(ev.y - obj['y']) <= handle_size:
-                                handle_hit = ('text', sel[1], 'se')
+                    handle_r2 = 8 * 8
+                    obj = attachments[sel[1]] if sel[0] == 'attach' else text_objects[sel[1]]
+                    # first corner within the handle radius (squared distance, no abs/sqrt)
+                    name = next((n for hx, hy, n in object_corners(*sel)
+                                 if (ev.x - hx) * (ev.x - hx) + (ev.y - hy) * (ev.y - hy) <= handle_r2), None)
+                    handle_hit = (sel[0], sel[1], name) if name else None
                     if handle_hit:
                         drawing['resize'] = handle_hit
                         drawing['active'] = True
@@ -1371,58 +1903,66 @@ class PhotoEditorApp(tk.Tk):
                             obj = text_objects[sel[1]]
                             drawing['offset'] = (ev.x - obj['x'], ev.y - obj['y'])
                         drawing['active'] = True
-
-                # start collecting stroke points for Pen/Eraser
-                if m in ('Pen', 'Eraser'):
-                    drawing['stroke_pts'] = [(ev.x, ev.y)]
+                        start_drag_sprite(sel)
+            elif m in ('Pen', 'Eraser'):
+                # start collecting stroke points (flat x, y ints); the whole stroke becomes one history entry on release
+                drawing['stroke_pts'] = array.array('i', (ev.x, ev.y))
 
         def on_move(ev):
             if not drawing['active']:
                 return
             m = mode_var.get()
+            if m not in ('Pen', 'Eraser'):
+                # drag/resize/shape previews cost a resample or a repaint per sample, so cap
+                # them at MOTION_INTERVAL; the latest skipped sample is replayed on release
+                now = time.perf_counter()
+                if now - drawing.get('_last_t', 0.0) < MOTION_INTERVAL:
+                    drawing['_pending_motion'] = ev
+                    return
+                drawing['_last_t'] = now
+                drawing['_pending_motion'] = None
             x, y = ev.x, ev.y
             sx, sy = drawing['start']
             lx, ly = drawing['last']
-            w = pen_width.get()
-            c = draw_color.get()
+            w = drawing['_w']
+            c = drawing['_c']
 
             if m in ('Pen', 'Eraser'):
-                # immediate drawing
-                color = c
-                if m == 'Eraser':
-                    # simple eraser: draw transparent if possible, otherwise white
-                    try:
-                        color = (255, 255, 255, 0)
-                    except Exception:
-                        color = '#ffffff'
-                try:
-                    wb_draw.line([lx, ly, x, y], fill=color, width=w)
-                except Exception:
-                    wb_draw.line([lx, ly, x, y], fill=c, width=w)
+                # every sample is kept so strokes stay smooth; drawing is deferred to the idle flush
+                # queue the segment; flush_pen_preview draws the batch in one call
+                # (eraser paints fully transparent pixels)
+                if not pen_dirty['pts']:
+                    pen_dirty['pts'] = [lx, ly]
+                pen_dirty['pts'] += (x, y)
+                pen_dirty['fill'] = (255, 255, 255, 0) if m == 'Eraser' else c
+                pen_dirty['width'] = w
                 drawing['last'] = (x, y)
                 # append to stroke points for collaborative sync
-                try:
-                    if 'stroke_pts' in drawing:
-                        drawing['stroke_pts'].append((x, y))
-                    else:
-                        drawing['stroke_pts'] = [(lx, ly), (x, y)]
-                except Exception:
-                    pass
-                update_preview()
+                pts = drawing.get('stroke_pts')
+                if pts is None:
+                    drawing['stroke_pts'] = array.array('i', (lx, ly, x, y))
+                else:
+                    pts.append(x)
+                    pts.append(y)
+                # only the segment's footprint changed; coalesced with other samples until idle
+                mark_pen_dirty((min(lx, x) - w, min(ly, y) - w, max(lx, x) + w + 1, max(ly, y) + w + 1))
             else:
                 # If moving a selected object (translation)
                 if m == 'Move' and drawing.get('selected') is not None and drawing.get('resize') is None:
                     sel = drawing['selected']
                     offx, offy = drawing.get('offset', (0, 0))
-                    if sel[0] == 'attach':
-                        a = attachments[sel[1]]
-                        a['x'] = int(x - offx)
-                        a['y'] = int(y - offy)
+                    obj = attachments[sel[1]] if sel[0] == 'attach' else text_objects[sel[1]]
+                    obj['x'] = int(x - offx)
+                    obj['y'] = int(y - offy)
+                    if drawing.get('drag_hidden') == sel:
+                        # just slide the sprite and selection outline; the board is untouched
+                        px, py = drawing['drag_pos']
+                        nx, ny = object_bbox(*sel)[:2]
+                        wb_canvas.move('wb_drag_sprite', nx - px, ny - py)
+                        wb_canvas.move('wb_sel', nx - px, ny - py)
+                        drawing['drag_pos'] = (nx, ny)
                     else:
-                        t = text_objects[sel[1]]
-                        t['x'] = int(x - offx)
-                        t['y'] = int(y - offy)
-                    update_preview()
+                        update_preview()
                     drawing['last'] = (x, y)
                     return
                 # If resizing an object
@@ -1452,58 +1992,70 @@ class PhotoEditorApp(tk.Tk):
                             new_h = max(8, a['y'] + a['h'] - y)
                             a['x'], a['y'] = int(x), int(y)
                             a['w'], a['h'] = int(new_w), int(new_h)
-                        # resize image from original for quality
+                        # cheap BILINEAR resample while dragging; the high-quality (memoized)
+                        # LANCZOS pass runs once on release
                         try:
-                            a['img'] = a.get('orig_img', a['img']).resize((max(1, a['w']), max(1, a['h'])), Image.Resampling.LANCZOS)
+                            a['img'] = a.get('orig_img', a['img']).resize((max(1, a['w']), max(1, a['h'])), Image.Resampling.BILINEAR)
+                            drawing['pending_resize'] = idx
                         except Exception:
-                            try:
-                                a['img'] = a.get('orig_img', a['img']).resize((max(1, a['w']), max(1, a['h'])))
-                            except Exception:
-                                pass
+                            pass
                     else:
                         t = text_objects[idx]
                         # use vertical drag to change font size
                         start_x, start_y = drawing.get('resize_start', (0, 0))
                         delta = y - start_y
-                        new_size = max(6, int(t.get('font_size', 20) + delta // 6))
+                        new_size = max(6, t['font_size'] + delta // 6)
                         t['font_size'] = new_size
                     update_preview()
                     drawing['last'] = (x, y)
                     return
-                # shape preview: draw on a temporary copy
-                tmp = wb_img.copy()
-                draw_tmp = ImageDraw.Draw(tmp)
-                # normalize coordinates so PIL doesn't raise when x1<x0 or y1<y0
+                # shape preview: a native canvas item moved with coords(), so the PIL
+                # buffer is untouched until the shape is committed in on_up
+                if m not in ('Line', 'Rect', 'Ellipse'):
+                    return
                 x0, x1 = (sx, x) if sx <= x else (x, sx)
                 y0, y1 = (sy, y) if sy <= y else (y, sy)
-                if m == 'Line':
-                    draw_tmp.line([sx, sy, x, y], fill=c, width=w)
+                coords = (sx, sy, x, y) if m == 'Line' else (x0, y0, x1, y1)
+                if wb_canvas.find_withtag('wb_shape_preview'):
+                    wb_canvas.coords('wb_shape_preview', *coords)
+                elif m == 'Line':
+                    wb_canvas.create_line(*coords, fill=c, width=w, tags=('wb_shape_preview',))
                 elif m == 'Rect':
-                    draw_tmp.rectangle([x0, y0, x1, y1], outline=c, width=w)
-                elif m == 'Ellipse':
-                    draw_tmp.ellipse([x0, y0, x1, y1], outline=c, width=w)
-                update_preview(tmp)
+                    wb_canvas.create_rectangle(*coords, outline=c, width=w, tags=('wb_shape_preview',))
+                else:
+                    wb_canvas.create_oval(*coords, outline=c, width=w, tags=('wb_shape_preview',))
 
         def on_up(ev):
+            # apply the last throttled motion sample so the final position is exact
+            pending_ev = drawing.pop('_pending_motion', None)
+            if pending_ev is not None and drawing['active']:
+                drawing['_last_t'] = 0.0
+                on_move(pending_ev)
+            drawing['_last_t'] = 0.0
             m = mode_var.get()
             drawing['active'] = False
+            wb_canvas.delete('wb_shape_preview')
             sx, sy = drawing['start']
             x, y = ev.x, ev.y
-            w = pen_width.get()
-            c = draw_color.get()
+            w = drawing.get('_w', 1)
+            c = drawing.get('_c', '#000000')
             if m in ('Pen', 'Eraser'):
-                # finish stroke
-                push_history()
-                # emit stroke to collaborators if connected
+                # rasterize any queued segments before snapshotting
+                flush_pen_preview()
+                # finish stroke: a click without movement drew nothing, so don't record it
+                pts = drawing.pop('stroke_pts', None)
+                if pts and len(pts) > 2:
+                    push_history()
+                # emit the whole stroke to collaborators once, as [(x, y), ...] pairs
                 try:
-                    pts = drawing.pop('stroke_pts', None)
-                    if pts:
-                        payload = {'points': pts, 'color': c, 'width': w, 'mode': m, 'id': str(uuid.uuid4())}
+                    if pts and len(pts) > 2:
+                        payload = {'points': list(zip(pts[0::2], pts[1::2])), 'color': c, 'width': w, 'mode': m, 'id': str(uuid.uuid4())}
                         emit_collab_operation('stroke', payload)
                 except Exception:
                     pass
             elif m == 'Line':
                 wb_draw.line([sx, sy, x, y], fill=c, width=w)
+                mark_raster_dirty()
                 push_history()
                 update_preview()
             elif m == 'Rect':
@@ -1511,16 +2063,27 @@ class PhotoEditorApp(tk.Tk):
                 x0, x1 = (sx, x) if sx <= x else (x, sx)
                 y0, y1 = (sy, y) if sy <= y else (y, sy)
                 wb_draw.rectangle([x0, y0, x1, y1], outline=c, width=w)
+                mark_raster_dirty()
                 push_history()
                 update_preview()
             elif m == 'Ellipse':
                 x0, x1 = (sx, x) if sx <= x else (x, sx)
                 y0, y1 = (sy, y) if sy <= y else (y, sy)
                 wb_draw.ellipse([x0, y0, x1, y1], outline=c, width=w)
+                mark_raster_dirty()
                 push_history()
                 update_preview()
             elif m == 'Move':
                 # finalize moving selection
+                pending = drawing.pop('pending_resize', None)
+                if pending is not None and 0 <= pending < len(attachments):
+                    a = attachments[pending]
+                    try:
+                        a['img'] = resized_attachment(a, a['w'], a['h'])
+                    except Exception:
+                        pass
+                    update_preview()
+                end_drag_sprite()
                 if drawing.get('selected') is not None or drawing.get('resize') is not None:
                     push_history()
                 drawing['selected'] = None
@@ -1534,32 +2097,16 @@ class PhotoEditorApp(tk.Tk):
         wb_canvas.bind('<B1-Motion>', on_move)
         wb_canvas.bind('<ButtonRelease-1>', on_up)
         def on_double_click(ev):
-            # Edit text object if double-clicked
-            for i in range(len(text_objects)-1, -1, -1):
-                t = text_objects[i]
-                try:
-                    fsize = int(t.get('font_size', 20))
-                    try:
-                        font = ImageFont.truetype('DejaVuSans.ttf', fsize)
-                    except Exception:
-                        font = ImageFont.load_default()
-                    bbox = ImageDraw.Draw(wb_img).textbbox((t['x'], t['y']), t['text'], font=font)
-                    x0, y0, x1, y1 = bbox
-                    if ev.x >= x0 and ev.x <= x1 and ev.y >= y0 and ev.y <= y1:
-                        newtxt = simpledialog.askstring('Edit Text', 'Edit text:', initialvalue=t['text'])
-                        if newtxt is not None:
-                            t['text'] = newtxt
-                            push_history()
-                            update_preview()
-                        return
-                except Exception:
-                    if abs(ev.x - t['x']) < 10 and abs(ev.y - t['y']) < 10:
-                        newtxt = simpledialog.askstring('Edit Text', 'Edit text:', initialvalue=t['text'])
-                        if newtxt is not None:
-                            t['text'] = newtxt
-                            push_history()
-                            update_preview()
-                        return
+            # Edit the topmost text object under the cursor (same grid index as Move picking)
+            hit = hit_test(ev.x, ev.y, kinds=('text',))
+            if hit is None:
+                return
+            t = text_objects[hit[1]]
+            newtxt = simpledialog.askstring('Edit Text', 'Edit text:', initialvalue=t['text'])
+            if newtxt is not None:
+                t['text'] = newtxt
+                push_history()
+                update_preview()
 
         wb_canvas.bind('<Double-1>', on_double_click)
 
@@ -1739,26 +2286,67 @@ class PhotoEditorApp(tk.Tk):
     
     # --- History Management ---
 
+    @staticmethod
+    def _pack_history(img):
+        """Compresses an image into a compact (mode, size, bytes) history entry."""
+        # zlib level 1 keeps the push cheap while still shrinking photos several-fold
+        return (img.mode, img.size, zlib.compress(img.tobytes(), 1))
+
+    @staticmethod
+    def _unpack_history(entry):
+        """Decodes a history entry back into a PIL image."""
+        mode, size, payload = entry
+        return Image.frombytes(mode, size, zlib.decompress(payload))
+
+    def _history_job(self, fn, arg):
+        """Runs a history pack/unpack on the background worker; returns its Future."""
+        if self._history_executor is None:
+            self._history_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+        return self._history_executor.submit(fn, arg)
+
+    def _history_image(self, entry):
+        """Resolves a history entry (image, packed tuple, or pending Future) to a PIL image."""
+        if hasattr(entry, 'result'):
+            entry = entry.result()
+        if isinstance(entry, tuple):
+            entry = self._unpack_history(entry)
+        return entry
+
+    def reset_history(self):
+        """Starts a fresh history holding only the current image."""
+        self.img_history.clear()
+        if self.img:
+            self.img_history.append(self.img.copy())
+
     def push_history(self):
         """Saves the current image state to the history stack."""
         if self.img:
+            # every mutator pushes history before replacing self.img
+            self._analysis_cache = {'src': None, 'report': None}
+            # deque(maxlen=10) drops the oldest step on its own
             self.img_history.append(self.img.copy())
-            # Keep history size reasonable (e.g., last 10 steps)
-            if len(self.img_history) > 10:
-                self.img_history.pop(0)
+            # Undo only ever needs the top two states at once; pack the one that just
+            # left that window off the Tk thread
+            if len(self.img_history) >= 3 and isinstance(self.img_history[-3], Image.Image):
+                self.img_history[-3] = self._history_job(self._pack_history, self.img_history[-3])
 
     def undo_last_action(self):
         """Reverts the image to the previous state in history."""
         if len(self.img_history) > 1:
             self.img_history.pop() # Remove current state (the one we are currently on)
-            self.img = self.img_history[-1].copy() # Revert to the last saved state
+            head = self._history_image(self.img_history[-1])
+            self.img_history[-1] = head
+            self.img = head.copy() # Revert to the last saved state
+            # Unpack the next state down in the background so a following undo is instant
+            if len(self.img_history) >= 2 and not isinstance(self.img_history[-2], Image.Image):
+                self.img_history[-2] = self._history_job(self._history_image, self.img_history[-2])
             self.update_canvas()
             # Distinct color for feedback/warning (Carrot Orange)
             self.status_label.config(text="Undo successful. Reverted to previous state.", foreground='#F39C12')
         elif self.original_img:
             # If only the original image is left in history, revert to it.
             self.img = self.original_img.copy()
-            self.img_history = [self.img.copy()]
+            self.reset_history()
             self.update_canvas()
             messagebox.showinfo("Info", "Reverted to the original image. Cannot undo further.")
         else:
@@ -1787,7 +2375,7 @@ class PhotoEditorApp(tk.Tk):
                 self.img = new_img.copy()
                 # Remember the file path so we can pass it to auxiliary tools
                 self.current_image_path = file_path
-                self.img_history = [self.img.copy()] # Initialize history with the original image
+                self.reset_history() # Initialize history with the original image
                 self.update_canvas()
                 # Distinct color for success (Emerald Green)
                 self.status_label.config(text=f"Image loaded: {os.path.basename(file_path)}", foreground='#2ECC71')
@@ -1818,7 +2406,7 @@ class PhotoEditorApp(tk.Tk):
         """Resets the image to the original loaded state."""
         if self.original_img:
             self.img = self.original_img.copy()
-            self.img_history = [self.img.copy()] # Reset history
+            self.reset_history() # Reset history
             self.update_canvas()
             # Distinct color for feedback/warning (Carrot Orange)
             self.status_label.config(text="Image reset to original.", foreground='#F39C12')
@@ -1838,6 +2426,13 @@ class PhotoEditorApp(tk.Tk):
             messagebox.showwarning("Warning", "No original image saved to reset to.")
             self.status_label.config(text="Ready.", foreground=self.fg_color)
             
+    def _canvas_size(self):
+        """Returns the cached (width, height) of the editor canvas."""
+        if not self._canvas_w:
+            # before the first <Configure> event
+            return self.canvas.winfo_width(), self.canvas.winfo_height()
+        return self._canvas_w, self._canvas_h
+
     def update_canvas(self):
         """Handles image resizing, display, and redrawing of UI elements (handles/crop) based on self.img."""
         if not self.img:
@@ -1846,8 +2441,9 @@ class PhotoEditorApp(tk.Tk):
         # Ensure no temporary image is active
         self.current_temp_img = None
         
-        canvas_width = self.canvas.winfo_width() - 40 
-        canvas_height = self.canvas.winfo_height() - 40 
+        canvas_w, canvas_h = self._canvas_size()
+        canvas_width = canvas_w - 40 
+        canvas_height = canvas_h - 40 
         
         if canvas_width <= 0 or canvas_height <= 0: return
 
@@ -1862,15 +2458,16 @@ class PhotoEditorApp(tk.Tk):
         new_height = int(img_height * ratio)
 
         if new_width > 0 and new_height > 0:
-            # Prepare image for display (ensure RGB mode)
-            display_img = self.img.convert('RGB').resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # Prepare image for display (ensure RGB mode); resampled from the cached proxy
+            display_img = resize_for_display(as_rgb(self._get_display_proxy()), (new_width, new_height))
                 
             self.tk_img = ImageTk.PhotoImage(display_img)
             
-            self.canvas.delete("all")
+            # Keep the resize handles alive while they are shown; draw_resize_handles just moves them
+            self.canvas.delete("!resize_handles" if self.resizing == True else "all")
             
-            center_x = self.canvas.winfo_width() / 2
-            center_y = self.canvas.winfo_height() / 2
+            center_x = canvas_w / 2
+            center_y = canvas_h / 2
             
             self.canvas.create_image(center_x, center_y, image=self.tk_img, anchor='center', tags="current_image")
             self.canvas.image = self.tk_img # Keep a reference
@@ -1882,13 +2479,33 @@ class PhotoEditorApp(tk.Tk):
                 center_x + new_width // 2,
                 center_y + new_height // 2
             )
+            # Canvas -> image pixel mapping for this zoom: img = canvas * scale + offset per axis
+            scale_x = img_width / new_width
+            scale_y = img_height / new_height
+            self._canvas_to_img_affine = (
+                (scale_x, -self.img_display_box[0] * scale_x),
+                (scale_y, -self.img_display_box[1] * scale_y),
+            )
             
             # If in resize mode, redraw handles
             if self.resizing == True: # Check specifically for True (handles visible) not 'active' (drag in progress)
                  self.draw_resize_handles()
         
+    def _request_redraw(self):
+        """Queues one update_canvas for the next idle; repeated requests collapse into it."""
+        # the committed image replaces any preview right away, as update_canvas would
+        self.current_temp_img = None
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._do_redraw)
+
+    def _do_redraw(self):
+        self._redraw_pending = False
+        self.update_canvas()
+
     def on_canvas_resize(self, event):
         """Called when the main canvas is resized."""
+        self._canvas_w, self._canvas_h = event.width, event.height
         # This will redraw either self.img or self.current_temp_img if it exists
         if self.current_temp_img:
             # If a preview is active, redraw the preview image
@@ -1920,7 +2537,22 @@ class PhotoEditorApp(tk.Tk):
         return False
 
     def draw_crop(self, event):
-        """Updates the cropping rectangle during drag."""
+        """Queues a crop-rectangle update; intermediate motion events are dropped."""
+        self._pending_crop_event = event
+        if self._crop_after_id is None:
+            self._crop_after_id = self.after(16, self._do_draw_crop)
+
+    def _flush_draw_crop(self):
+        """Applies a queued crop-rectangle update immediately."""
+        if self._crop_after_id is not None:
+            self.after_cancel(self._crop_after_id)
+            self._do_draw_crop()
+
+    def _do_draw_crop(self):
+        """Updates the cropping rectangle from the latest drag event."""
+        self._crop_after_id = None
+        event, self._pending_crop_event = self._pending_crop_event, None
+        if event is None: return
         if self.cropping and self.crop_rectangle and self.img_display_box:
             canvas_x = self.canvas.canvasx(event.x)
             canvas_y = self.canvas.canvasy(event.y)
@@ -1934,26 +2566,21 @@ class PhotoEditorApp(tk.Tk):
 
     def apply_crop(self, event):
         """Applies the crop based on the final rectangle coordinates."""
+        self._flush_draw_crop()
         if self.cropping and self.crop_rectangle and self.img:
             self.cropping = False
             self.canvas.config(cursor="")
             
             x1, y1, x2, y2 = self.canvas.coords(self.crop_rectangle)
             
-            if not self.img_display_box: return
+            if not self.img_display_box or not self._canvas_to_img_affine: return
 
-            img_start_x, img_start_y, _, _ = self.img_display_box
-            disp_w = self.tk_img.width()
-            disp_h = self.tk_img.height()
-            
-            scale_x = self.img.size[0] / disp_w
-            scale_y = self.img.size[1] / disp_h
-            
-            # Map canvas crop box to original image coordinates
-            original_x1 = int((min(x1, x2) - img_start_x) * scale_x)
-            original_y1 = int((min(y1, y2) - img_start_y) * scale_y)
-            original_x2 = int((max(x1, x2) - img_start_x) * scale_x)
-            original_y2 = int((max(y1, y2) - img_start_y) * scale_y)
+            # Map canvas crop box to original image coordinates (mapping precomputed in update_canvas)
+            (scale_x, off_x), (scale_y, off_y) = self._canvas_to_img_affine
+            original_x1 = int(min(x1, x2) * scale_x + off_x)
+            original_y1 = int(min(y1, y2) * scale_y + off_y)
+            original_x2 = int(max(x1, x2) * scale_x + off_x)
+            original_y2 = int(max(y1, y2) * scale_y + off_y)
 
             if original_x2 > original_x1 and original_y2 > original_y1:
                 self.push_history()
@@ -1990,12 +2617,21 @@ class PhotoEditorApp(tk.Tk):
             'sw': (x1 - s, y2 - s), 's': ((x1 + x2) / 2 - s, y2 - s), 'se': (x2 - s, y2 - s),
         }
 
+        size = self.resize_handle_size
+        # Reuse the 8 existing handle items (and their bindings) when they are still on the canvas
+        if len(self.resize_handles) == 8 and len(self.canvas.find_withtag("resize_handles")) == 8:
+            for mode, (hx, hy) in handle_positions.items():
+                self.canvas.coords(self.resize_handles[mode], hx, hy, hx + size, hy + size)
+            self.canvas.itemconfigure("resize_handles", fill=self.accent_primary)
+            self.canvas.tag_raise("resize_handles")
+            return
+
         self.canvas.delete("resize_handles")
         self.resize_handles = {}
         
         for mode, (hx, hy) in handle_positions.items():
             handle_id = self.canvas.create_oval(
-                hx, hy, hx + self.resize_handle_size, hy + self.resize_handle_size,
+                hx, hy, hx + size, hy + size,
                 fill=self.accent_primary, outline='white', width=1, tags=("resize_handles", mode)
             )
             self.resize_handles[mode] = handle_id
@@ -2034,7 +2670,22 @@ class PhotoEditorApp(tk.Tk):
         return False 
 
     def drag_resize(self, event):
-        """Calculates the new size and updates the canvas image during a drag."""
+        """Queues a resize-preview update; intermediate motion events are dropped."""
+        self._pending_resize_event = event
+        if self._resize_after_id is None:
+            self._resize_after_id = self.after(16, self._do_drag_resize)
+
+    def _flush_drag_resize(self):
+        """Applies a queued resize-preview update immediately."""
+        if self._resize_after_id is not None:
+            self.after_cancel(self._resize_after_id)
+            self._do_drag_resize()
+
+    def _do_drag_resize(self):
+        """Calculates the new size and updates the canvas image from the latest drag event."""
+        self._resize_after_id = None
+        event, self._pending_resize_event = self._pending_resize_event, None
+        if event is None: return
         if self.resizing != 'active' or not self.img_display_box: return
         
         initial_w, initial_h = self.original_img_size_on_canvas
@@ -2062,33 +2713,42 @@ class PhotoEditorApp(tk.Tk):
         
         # Create and display temporary image
         try:
-            # Resize the actual PIL image (in memory)
-            # Use NEAREST for speed during interactive drag
-            self.current_temp_img = self.img.resize((target_img_w, target_img_h), Image.Resampling.NEAREST)
-            # Resize the display version for the canvas
-            temp_disp_img = self.current_temp_img.resize((new_w, new_h), Image.Resampling.NEAREST).convert('RGB')
+            # Only the display-sized image is built while dragging; the full-resolution
+            # resize runs once in end_drag_resize
+            self._pending_final_size = (max(1, target_img_w), max(1, target_img_h))
+            # One BILINEAR resample of the small display proxy: cheap, and without NEAREST's jaggies
+            temp_disp_img = as_rgb(self._get_display_proxy().resize((new_w, new_h), Image.Resampling.BILINEAR))
 
-            self.tk_img_temp = ImageTk.PhotoImage(temp_disp_img)
+            self._set_temp_photo(temp_disp_img)
             
             image_id = self.canvas.find_withtag("current_image")
             if image_id:
-                # Update image content and size visually
-                self.canvas.coords(image_id[0], self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2)
-                self.canvas.itemconfig(image_id[0], image=self.tk_img_temp)
-                self.canvas.image = self.tk_img_temp # Important: update reference
+                # Update image content and size visually. Tk already defers the repaint to
+                # idle, so the saving is in only touching what changed: the item stays
+                # centred, and a photo pasted in place needs no reconfigure.
+                canvas_w, canvas_h = self._canvas_size()
+                center = (canvas_w / 2, canvas_h / 2)
+                if tuple(self.canvas.coords(image_id[0])) != center:
+                    self.canvas.coords(image_id[0], *center)
+                if self.canvas.image is not self.tk_img_temp:
+                    self.canvas.itemconfig(image_id[0], image=self.tk_img_temp)
+                    self.canvas.image = self.tk_img_temp # Important: update reference
                 
         except Exception as e:
             print(f"Error during drag resize: {e}")
 
     def end_drag_resize(self, event):
         """Applies the final resize, pushes to history, and cleans up state."""
+        # make sure the release position is what gets applied
+        self._flush_drag_resize()
         if self.resizing == 'active':
             self.resizing = True # Back to handle-visible mode
             self.canvas.itemconfig("current_image", outline="", dash="")
             
-            if self.current_temp_img:
+            if self._pending_final_size:
                 self.push_history()
-                self.img = self.current_temp_img.copy()
+                self.img = self.img.resize(self._pending_final_size, Image.Resampling.LANCZOS)
+                self._pending_final_size = None
                 self.current_temp_img = None
                 self.update_canvas() # Redraw the canvas, which includes the handles
                 self.status_label.config(text="Image successfully resized.", foreground='#2ECC71')
@@ -2096,6 +2756,57 @@ class PhotoEditorApp(tk.Tk):
             return True 
         return False 
     
+    def _get_display_proxy(self):
+        """Returns self.img downscaled to at most ~2x the canvas, rebuilt only when the image or canvas size changes."""
+        canvas_w, canvas_h = self._canvas_size()
+        canvas_w, canvas_h = max(1, canvas_w), max(1, canvas_h)
+        signature = (self.img.size, canvas_w, canvas_h)
+        if self._display_proxy is None or self._display_proxy_src is not self.img or self._display_proxy_signature != signature:
+            img_w, img_h = self.img.size
+            scale = min(2 * canvas_w / img_w, 2 * canvas_h / img_h)
+            if scale < 1:
+                proxy_size = (max(1, int(img_w * scale)), max(1, int(img_h * scale)))
+                self._display_proxy = self.img.resize(proxy_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            else:
+                self._display_proxy = self.img
+            self._display_proxy_src = self.img
+            self._display_proxy_signature = signature
+        return self._display_proxy
+
+    def _apply_adjustment(self, base_img, command_type, value):
+        """Applies a single brightness/contrast/blur adjustment and returns the new image."""
+        if command_type in ('brightness', 'contrast'):
+            # Both are per-value affine maps, so one 256-entry LUT pass replaces
+            # ImageEnhance's blend against a synthetic image. Same formulas as Pillow:
+            # brightness scales towards black, contrast towards the mean gray level,
+            # and the result truncates like Image.blend (no rounding).
+            levels = np.arange(256, dtype=np.float32)
+            if command_type == 'brightness':
+                mapped = levels * value
+            else:
+                mean = int(np.asarray(base_img.convert('L')).mean() + 0.5)
+                mapped = (levels - mean) * value + mean
+            lut = np.clip(mapped, 0, 255).astype(np.uint8).tolist()
+            return base_img.point(lut * len(base_img.getbands()))
+        if command_type == 'blur' and value > 0:
+            if cv2 is not None and base_img.mode in ('L', 'RGB'):
+                try:
+                    # Pillow's blur radius is the Gaussian sigma
+                    return Image.fromarray(cv2.GaussianBlur(np.asarray(base_img), (0, 0), sigmaX=value))
+                except Exception:
+                    pass
+            return base_img.filter(ImageFilter.GaussianBlur(radius=value))
+        return base_img
+
+    def _set_temp_photo(self, display_img):
+        """Updates self.tk_img_temp from display_img, pasting in place when the size is unchanged."""
+        photo = self.tk_img_temp
+        if photo is not None and (photo.width(), photo.height()) == display_img.size:
+            photo.paste(display_img)
+        else:
+            self.tk_img_temp = ImageTk.PhotoImage(display_img)
+        return self.tk_img_temp
+
     # --- Enhancement/Preview Functions (Placeholder - Implement these in full app) ---
     def apply_enhancement_preview(self, command_type, value):
         """
@@ -2104,21 +2815,17 @@ class PhotoEditorApp(tk.Tk):
         """
         if not self.img: return
         
-        base_img = self.img
+        # Preview on the display proxy; commit_enhancement reruns the op at full resolution
+        base_img = self._get_display_proxy()
+        preview_value = value
+        if command_type == 'blur':
+            # blur radius is in pixels, so shrink it with the proxy
+            preview_value = value * base_img.size[0] / self.img.size[0]
         
         # Only apply a single adjustment at a time for simplicity in this example
-        if command_type == 'brightness':
-            enhancer = ImageEnhance.Brightness(base_img)
-            temp_img = enhancer.enhance(value)
-        elif command_type == 'contrast':
-            enhancer = ImageEnhance.Contrast(base_img)
-            temp_img = enhancer.enhance(value)
-        elif command_type == 'blur':
-            if value > 0:
-                temp_img = base_img.filter(ImageFilter.GaussianBlur(radius=value))
-            else:
-                temp_img = base_img
+        temp_img = self._apply_adjustment(base_img, command_type, preview_value)
 
+        self._preview_op = (command_type, value)
         self.current_temp_img = temp_img
         self.update_canvas_preview(temp_img)
 
@@ -2126,8 +2833,9 @@ class PhotoEditorApp(tk.Tk):
         """Redraws the canvas using a temporary image."""
         if not temp_img: return
 
-        canvas_width = self.canvas.winfo_width() - 40 
-        canvas_height = self.canvas.winfo_height() - 40 
+        canvas_w, canvas_h = self._canvas_size()
+        canvas_width = canvas_w - 40 
+        canvas_height = canvas_h - 40 
         
         if canvas_width <= 0 or canvas_height <= 0: return
 
@@ -2141,14 +2849,14 @@ class PhotoEditorApp(tk.Tk):
         new_height = int(img_height * ratio)
 
         if new_width > 0 and new_height > 0:
-            display_img = temp_img.convert('RGB').resize((new_width, new_height), Image.Resampling.LANCZOS)
+            display_img = resize_for_display(as_rgb(temp_img), (new_width, new_height))
                 
-            self.tk_img_temp = ImageTk.PhotoImage(display_img)
+            self._set_temp_photo(display_img)
             
             # Find the existing image and update it, or create a new one
             image_id = self.canvas.find_withtag("current_image")
-            center_x = self.canvas.winfo_width() / 2
-            center_y = self.canvas.winfo_height() / 2
+            center_x = canvas_w / 2
+            center_y = canvas_h / 2
             
             if image_id:
                 self.canvas.itemconfig(image_id[0], image=self.tk_img_temp)
@@ -2163,8 +2871,11 @@ class PhotoEditorApp(tk.Tk):
         """Commits the current previewed enhancement to the main image history."""
         if self.current_temp_img:
             self.push_history()
-            self.img = self.current_temp_img.copy()
+            # the preview was rendered from the display proxy; apply the op to the full image
+            op_type, op_value = self._preview_op or (command_type, var.get())
+            self.img = self._apply_adjustment(self.img, op_type, op_value)
             self.current_temp_img = None
+            self._preview_op = None
             self.update_canvas() # Redraw committed state
             self.status_label.config(text=f"{title} applied and committed.", foreground='#2ECC71')
         else:
@@ -2182,8 +2893,9 @@ class PhotoEditorApp(tk.Tk):
     def convert_grayscale(self):
         if not self.img: return
         self.push_history()
-        self.img = self.img.convert('L').convert('RGB')
-        self.update_canvas()
+        # Keep a single-band 'L' image; the display path converts only the small proxy to RGB
+        self.img = self.img.convert('L')
+        self._request_redraw()
         self.status_label.config(text="Converted to Grayscale.", foreground='#2ECC71')
 
     def convert_hsv(self):
@@ -2191,31 +2903,32 @@ class PhotoEditorApp(tk.Tk):
         self.push_history()
         # Convert to HSV, then back to RGB for display compatibility
         self.img = self.img.convert('HSV').convert('RGB') 
-        self.update_canvas()
+        self._request_redraw()
         self.status_label.config(text="Converted to HSV (displaying RGB interpretation).", foreground='#2ECC71')
 
     def convert_binary(self):
         if not self.img: return
         self.push_history()
         # Convert to grayscale, then threshold (e.g., 128)
-        gray_img = self.img.convert('L')
-        # Simple binary conversion: 0 if < 128, 255 if >= 128
-        self.img = gray_img.point(lambda x: 255 if x > 128 else 0, '1').convert('RGB')
-        self.update_canvas()
+        gray = np.asarray(self.img.convert('L'))
+        # Simple binary conversion: 0 if <= 128, 255 if > 128 (one vectorized compare)
+        mask = Image.fromarray((gray > 128).astype(np.uint8) * 255, 'L')
+        self.img = Image.merge('RGB', (mask, mask, mask))
+        self._request_redraw()
         self.status_label.config(text="Converted to Binary (Threshold 128).", foreground='#2ECC71')
         
     def invert_image(self):
         if not self.img: return
         self.push_history()
         self.img = ImageOps.invert(self.img)
-        self.update_canvas()
+        self._request_redraw()
         self.status_label.config(text="Colors inverted.", foreground='#2ECC71')
 
     def rotate_image(self):
         if not self.img: return
         self.push_history()
         self.img = self.img.rotate(-90, expand=True) # Rotate 90 degrees clockwise
-        self.update_canvas()
+        self._request_redraw()
         self.status_label.config(text="Rotated 90° Clockwise.", foreground='#2ECC71')
 
     def flip_image(self):
@@ -2226,7 +2939,7 @@ class PhotoEditorApp(tk.Tk):
             self.img = self.img.transpose(Image.FLIP_LEFT_RIGHT)
         elif direction == "Vertical":
             self.img = self.img.transpose(Image.FLIP_TOP_BOTTOM)
-        self.update_canvas()
+        self._request_redraw()
         self.status_label.config(text=f"Flipped {direction}ly.", foreground='#2ECC71')
         
     def view_image_properties(self):
@@ -2248,38 +2961,73 @@ class PhotoEditorApp(tk.Tk):
             messagebox.showwarning("Warning", "Load an image first.")
             return
         
-        # Calculate histograms for R, G, B channels
-        r, g, b = self.img.split()
-        
-        # Matplotlib Figure setup
-        fig, ax = plt.subplots(figsize=(6, 4))
-        fig.patch.set_facecolor(self.panel_bg)
-        ax.set_facecolor(self.dark_bg)
-        ax.tick_params(colors=self.fg_color)
-        ax.xaxis.label.set_color(self.fg_color)
-        ax.yaxis.label.set_color(self.fg_color)
-        ax.title.set_color(self.fg_color)
-
-        ax.hist(np.array(r).flatten(), bins=256, color='red', alpha=0.6, label='Red')
-        ax.hist(np.array(g).flatten(), bins=256, color='green', alpha=0.6, label='Green')
-        ax.hist(np.array(b).flatten(), bins=256, color='blue', alpha=0.6, label='Blue')
-        ax.set_title('RGB Histogram')
-        ax.set_xlabel('Pixel Value')
-        ax.set_ylabel('Frequency')
-        ax.legend(facecolor=self.panel_bg, edgecolor=self.separator_color, labelcolor=self.fg_color)
-        
-        # Create a new Tkinter Toplevel window for the plot
-        plot_window = tk.Toplevel(self)
-        plot_window.title("Image Histogram")
-        plot_window.configure(bg=self.dark_bg)
-        
-        # Embed Matplotlib figure into Tkinter window
-        canvas_plot = FigureCanvasTkAgg(fig, master=plot_window)
-        canvas_widget = canvas_plot.get_tk_widget()
-        canvas_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        canvas_plot.draw()
-        
-        self.status_label.config(text="Displaying image histogram.", foreground=self.accent_primary)
+        # Theme colors are read here, on the Tk thread
+        panel_bg, dark_bg = self.panel_bg, self.dark_bg
+        fg_color, separator_color = self.fg_color, self.separator_color
+
+        # Background worker: histogram + a small PIL-drawn plot (no plotting library needed)
+        def _worker(src_img):
+            try:
+                # Calculate histograms for R, G, B channels (one C pass, 768 bin counts)
+                rgb = as_rgb(src_img)
+                hist = rgb.histogram()
+                channels = (('Red', hist[0:256], (255, 0, 0, 150)),
+                            ('Green', hist[256:512], (0, 160, 0, 150)),
+                            ('Blue', hist[512:768], (0, 0, 255, 150)))
+
+                # Plot area: 2 px per bin, 240 px tall, with room for title/axes/labels
+                left, top, plot_w, plot_h = 56, 36, 512, 240
+                base = top + plot_h
+                plot_img = Image.new('RGB', (left + plot_w + 24, base + 48), panel_bg)
+                draw = ImageDraw.Draw(plot_img, 'RGBA')
+                font = load_font(12)
+                draw.rectangle([left, top, left + plot_w, base], fill=dark_bg, outline=separator_color)
+
+                # One filled polygon per channel; alpha fills blend where channels overlap
+                peak = max(1, max(max(h) for _, h, _ in channels))
+                scale = plot_h / peak
+                for _, h, color in channels:
+                    pts = [(left, base)]
+                    pts.extend((left + 2 * i + 1, base - h[i] * scale) for i in range(256))
+                    pts.append((left + plot_w, base))
+                    draw.polygon(pts, fill=color)
+
+                # Title, axes labels and ticks
+                draw.text((left, 10), 'RGB Histogram', fill=fg_color, font=font)
+                for v in (0, 64, 128, 192, 255):
+                    x = left + 2 * v + 1
+                    draw.line([(x, base), (x, base + 4)], fill=fg_color)
+                    draw.text((x - 6, base + 6), str(v), fill=fg_color, font=font)
+                draw.text((left + plot_w // 2 - 30, base + 26), 'Pixel Value', fill=fg_color, font=font)
+                draw.text((4, top), str(peak), fill=fg_color, font=font)
+                draw.text((4, base - 14), '0', fill=fg_color, font=font)
+
+                # Legend
+                lx = left + plot_w - 70
+                for n, (name, _, color) in enumerate(channels):
+                    ly = top + 8 + n * 16
+                    draw.rectangle([lx, ly, lx + 10, ly + 10], fill=color)
+                    draw.text((lx + 16, ly - 2), name, fill=fg_color, font=font)
+
+                # Show the finished plot as a static image on the Tk thread
+                def _show():
+                    plot_window = tk.Toplevel(self)
+                    plot_window.title("Image Histogram")
+                    plot_window.configure(bg=self.dark_bg)
+                    photo = ImageTk.PhotoImage(plot_img)
+                    label = tk.Label(plot_window, image=photo, bg=self.dark_bg)
+                    label.image = photo # Keep a reference
+                    label.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+                    self.status_label.config(text="Displaying image histogram.", foreground=self.accent_primary)
+
+                self.after(1, _show)
+
+            except Exception as e:
+                self.after(1, lambda e=e: (messagebox.showerror("Histogram Error", f"Failed to build histogram: {e}"), self.status_label.config(text="Ready.", foreground=self.fg_color)))
+
+        self.status_label.config(text="Building histogram...", foreground=self.accent_primary)
+        # self.img is only ever replaced, never modified in place, so no copy is needed
+        threading.Thread(target=_worker, args=(self.img,), daemon=True).start()
 
     def analyze_image_with_open_source_model(self):
         """
@@ -2287,7 +3035,7 @@ class PhotoEditorApp(tk.Tk):
 
         Metrics produced:
         - Average RGB color
-        - Dominant colors (k-means, top 3)
+        - Dominant colors (top 3 bins of a 32x32x32 RGB histogram)
         - Edge count and edge density (Canny)
         - Sharpness estimate (Laplacian variance)
         - Approximate object/contour count (contours from edges)
@@ -2299,13 +3047,20 @@ class PhotoEditorApp(tk.Tk):
             messagebox.showwarning("Warning", "Please load an image first before running local analysis.")
             return
 
+        # Re-running on an unchanged image just shows the previous report
+        if self._analysis_cache['src'] is self.img and self._analysis_cache['report']:
+            self._display_analysis_result(self._analysis_cache['report'], title="Local CV Analysis Report")
+            self.status_label.config(text="Local CV Analysis completed.", foreground=self.success_color)
+            return
+
         # Small status update and UI refresh
         self.status_label.config(text="Performing local Computer Vision analysis...", foreground=self.accent_primary)
         try:
             self.update_idletasks()
 
-            # Convert to RGB numpy array
-            np_img = np.array(self.img.convert('RGB'))
+            # RGB numpy array: as_rgb skips convert() for RGB images, but asarray still
+            # copies the pixels once (PIL exports through tobytes())
+            np_img = np.asarray(as_rgb(self.img))
             h, w = np_img.shape[:2]
 
             # Downsample large images for speed (keep aspect ratio)
@@ -2320,9 +3075,9 @@ class PhotoEditorApp(tk.Tk):
                     if cv2 is not None:
                         small = cv2.resize(np_img, (new_w, new_h), interpolation=cv2.INTER_AREA)
                     else:
-                        small = np.array(self.img.resize((new_w, new_h), Image.Resampling.LANCZOS).convert('RGB'))
+                        small = np.asarray(as_rgb(self.img.resize((new_w, new_h), Image.Resampling.LANCZOS)))
                 except Exception:
-                    small = np.array(self.img.resize((new_w, new_h), Image.Resampling.LANCZOS).convert('RGB'))
+                    small = np.asarray(as_rgb(self.img.resize((new_w, new_h), Image.Resampling.LANCZOS)))
             else:
                 small = np_img.copy()
 
@@ -2336,9 +3091,9 @@ class PhotoEditorApp(tk.Tk):
                 if cv2 is not None:
                     gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
                 else:
-                    gray = (0.2989 * small[..., 0] + 0.5870 * small[..., 1] + 0.1140 * small[..., 2]).astype('uint8')
+                    gray = small.astype(np.float32).dot(GRAY_WEIGHTS).astype(np.uint8)
             except Exception:
-                gray = (0.2989 * small[..., 0] + 0.5870 * small[..., 1] + 0.1140 * small[..., 2]).astype('uint8')
+                gray = small.astype(np.float32).dot(GRAY_WEIGHTS).astype(np.uint8)
 
             # 3) Sharpness (Laplacian variance) and edges (Canny)
             try:
@@ -2357,11 +3112,7 @@ class PhotoEditorApp(tk.Tk):
                     object_count = sum(1 for c in contours if cv2.contourArea(c) > 100)  # ignore tiny contours
                 else:
                     # Fallback simple gradient magnitude
-                    gx = np.gradient(gray.astype(float), axis=1)
-                    gy = np.gradient(gray.astype(float), axis=0)
-                    grad = np.hypot(gx, gy)
-                    sharpness = float(np.var(grad))
-                    edge_count = int((grad > 50).sum())
+                    sharpness, edge_count = gradient_stats(gray)
                     object_count = 0
             except Exception:
                 # Fallback values
@@ -2371,24 +3122,19 @@ class PhotoEditorApp(tk.Tk):
 
             edge_density = (edge_count / float(total_pixels)) * 100.0 if total_pixels > 0 else 0.0
 
-            # 4) Dominant colors - kmeans (cv2.kmeans if available, otherwise simple histogram fallback)
+            # 4) Dominant colors - one bincount over 5-bit-per-channel packed RGB (32768 bins)
             dominant_colors = []
             try:
-                Z = small.reshape((-1, 3)).astype(np.float32)
-                K = 3
-                if cv2 is not None:
-                    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-                    _, labels, centers = cv2.kmeans(Z, K, None, criteria, 10, cv2.KMEANS_PP_CENTERS)
-                    centers = centers.astype(int)
-                    counts = np.bincount(labels.flatten(), minlength=K)
-                    # Sort by count
-                    order = np.argsort(-counts)
-                    for i in order:
-                        c = centers[i]
-                        dominant_colors.append((int(c[0]), int(c[1]), int(c[2]), int(counts[i])))
-                else:
-                    # simple fallback: use average as single dominant
-                    dominant_colors.append((int(avg_color[0]), int(avg_color[1]), int(avg_color[2]), total_pixels))
+                q = (small >> 3).astype(np.uint32)
+                idx = (q[..., 0] << 10) | (q[..., 1] << 5) | q[..., 2]
+                counts = np.bincount(idx.ravel(), minlength=1 << 15)
+                top = np.argpartition(counts, -3)[-3:]
+                for i in top[np.argsort(-counts[top])]:
+                    if counts[i] == 0:
+                        continue
+                    # report the centre of each bin
+                    r, g, b = (((i >> 10) & 31) << 3) | 4, (((i >> 5) & 31) << 3) | 4, ((i & 31) << 3) | 4
+                    dominant_colors.append((int(r), int(g), int(b), int(counts[i])))
             except Exception:
                 dominant_colors.append((int(avg_color[0]), int(avg_color[1]), int(avg_color[2]), total_pixels))
 
@@ -2433,6 +3179,7 @@ class PhotoEditorApp(tk.Tk):
                 report_lines.append("  - High sharpness: image contains many high-frequency details.")
 
             final_report = "\n".join(report_lines)
+            self._analysis_cache = {'src': self.img, 'report': final_report}
 
             # Show results in a scrollable window
             self._display_analysis_result(final_report, title="Local CV Analysis Report")
@@ -2464,34 +3211,37 @@ class PhotoEditorApp(tk.Tk):
         def _worker(img_copy):
             try:
                 # Convert to NumPy RGB array
-                arr = np.array(img_copy.convert('RGB'))
+                arr = np.array(as_rgb(img_copy))
 
                 # 1) Denoise (OpenCV preferred)
                 if cv2 is not None:
                     try:
-                        denoised = cv2.fastNlMeansDenoisingColored(arr, None, 10, 10, 7, 21)
+                        h, w = arr.shape[:2]
+                        if max(h, w) > 1500:
+                            # Non-local means is the slowest step: run it at half size, scale
+                            # back up and blend with the original to keep fine detail
+                            half = cv2.resize(arr, (w // 2, h // 2), interpolation=cv2.INTER_AREA)
+                            half = cv2.fastNlMeansDenoisingColored(half, None, 10, 10, 7, 21)
+                            up = cv2.resize(half, (w, h), interpolation=cv2.INTER_LINEAR)
+                            denoised = cv2.addWeighted(up, 0.7, arr, 0.3, 0)
+                        else:
+                            denoised = cv2.fastNlMeansDenoisingColored(arr, None, 10, 10, 7, 21)
                     except Exception:
                         denoised = arr
 
                     # 2) CLAHE on L channel
                     try:
-                        lab = cv2.cvtColor(denoised, cv2.COLOR_RGB2LAB)
-                        l, a, b = cv2.split(lab)
-                        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-                        cl = clahe.apply(l)
-                        limg = cv2.merge((cl, a, b))
-                        enhanced = cv2.cvtColor(limg, cv2.COLOR_LAB2RGB)
+                        enhanced = clahe_rgb(denoised, 3.0)
                     except Exception:
                         enhanced = denoised
 
                     # 3) Unsharp mask (manual)
                     try:
-                        gaussian = cv2.GaussianBlur(enhanced, (0, 0), sigmaX=1.0)
-                        unsharp = cv2.addWeighted(enhanced, 1.5, gaussian, -0.5, 0)
+                        unsharp = unsharp_inplace(enhanced, 1.0)
                     except Exception:
                         unsharp = enhanced
 
-                    result_pil = Image.fromarray(np.clip(unsharp, 0, 255).astype('uint8'))
+                    result_pil = Image.fromarray(to_uint8(unsharp))
                 else:
                     # Pillow fallback
                     try:
@@ -2531,6 +3281,23 @@ class PhotoEditorApp(tk.Tk):
         worker_thread = threading.Thread(target=_worker, args=(self.img.copy(),), daemon=True)
         worker_thread.start()
 
+    def _get_tile_executor(self):
+        """Returns the shared thread pool used for tiled enhancement (created on first use)."""
+        if self._tile_executor is None:
+            self._tile_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='enhance-tile')
+        return self._tile_executor
+
+    def _scratch(self, name, shape, dtype=np.uint8):
+        """Returns a reusable array for pipeline intermediates; reallocated only when shape/dtype change.
+
+        Hold self._scratch_lock while using it: preview and apply workers can overlap briefly.
+        """
+        buf = self._scratch_bufs.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype)
+            self._scratch_bufs[name] = buf
+        return buf
+
     def _enhancement_pipeline(self, pil_img, params: dict, cancel_event: 'threading.Event' = None):
         """Apply an enhancement pipeline to a PIL image according to params.
 
@@ -2542,9 +3309,12 @@ class PhotoEditorApp(tk.Tk):
         - color: float
         - gamma: float
 
+        Input img is read-only: it is never modified (the array path starts from np.array,
+        a fresh copy), so callers pass self.img directly. The result may be pil_img itself
+        when every stage is an identity.
         cancel_event (optional): a threading.Event that, if set, should cause the pipeline to abort early.
         """
-        img = pil_img.convert('RGB')
+        img = as_rgb(pil_img)
         arr = np.array(img)
 
         def _check_cancel():
@@ -2553,43 +3323,44 @@ class PhotoEditorApp(tk.Tk):
 
         # OpenCV path (preferred for quality & speed)
         if cv2 is not None:
+            # Denoise and sharpen only look at a small neighbourhood, so on large images
+            # they run per tile to keep the working set cache-sized. CLAHE and the
+            # color/contrast/gamma tail depend on global statistics and stay whole-image.
+            tiled = arr.shape[0] * arr.shape[1] > TILED_MIN_PIXELS
+
+            def _local_stage(fn):
+                if tiled:
+                    return process_tiled(arr, fn, check_cancel=_check_cancel, executor=self._get_tile_executor())
+                return fn(arr)
+
             try:
                 denoise = int(params.get('denoise', 10))
                 if denoise > 0:
                     _check_cancel()
-                    arr = cv2.fastNlMeansDenoisingColored(arr, None, h=denoise, hColor=denoise, templateWindowSize=7, searchWindowSize=21)
+                    arr = _local_stage(lambda t: denoise_colored(t, denoise))
 
                 _check_cancel()
                 # CLAHE
                 clahe_clip = float(params.get('clahe', 2.0))
-                lab = cv2.cvtColor(arr, cv2.COLOR_RGB2LAB)
-                l, a, b = cv2.split(lab)
-                clahe = cv2.createCLAHE(clipLimit=clahe_clip, tileGridSize=(8,8))
-                cl = clahe.apply(l)
-                lab = cv2.merge((cl, a, b))
-                arr = cv2.cvtColor(lab, cv2.COLOR_LAB2RGB)
+                arr = to_uint8(arr)
+                with self._scratch_lock:
+                    # arr is our own copy, so convert straight back into it
+                    clahe_rgb(arr, clahe_clip, lab=self._scratch('lab', arr.shape), dst=arr)
 
                 _check_cancel()
                 # Unsharp (adaptive)
                 sharpen = float(params.get('sharpen', 1.0))
                 if sharpen > 0:
-                    gaussian = cv2.GaussianBlur(arr, (0,0), sigmaX=1.0)
-                    arr = cv2.addWeighted(arr, 1.0 + sharpen*0.5, gaussian, -0.5*sharpen, 0)
+                    arr = _local_stage(lambda t: unsharp_inplace(t, sharpen))
 
                 _check_cancel()
-                # Color/Contrast/Gamma adjustments using a lightweight approach (convert to LAB for contrast if needed)
-                result = Image.fromarray(np.clip(arr,0,255).astype('uint8'))
-                result = result.convert('RGB')
-                _check_cancel()
-                # Use Pillow for the final color/contrast/gamma steps for simplicity
-                result = ImageEnhance.Contrast(result).enhance(float(params.get('contrast', 1.0)))
-                _check_cancel()
-                result = ImageEnhance.Color(result).enhance(float(params.get('color', 1.0)))
-                _check_cancel()
-                g = float(params.get('gamma', 1.0))
-                if g != 1.0:
-                    lut = [pow(x/255.0, 1.0/g)*255 for x in range(256)]
-                    result = result.point(lut*3)
+                # Contrast -> Color -> Gamma on the array, in the same order and with the
+                # same rounding as the ImageEnhance chain
+                arr = tone_tail(to_uint8(arr), float(params.get('contrast', 1.0)),
+                                float(params.get('color', 1.0)), float(params.get('gamma', 1.0)),
+                                check_cancel=_check_cancel)
+                # HxWx3 uint8 is already RGB; no convert() copy
+                result = Image.fromarray(arr, 'RGB')
 
             except RuntimeError:
                 # bubbled up cancellation
@@ -2618,15 +3389,15 @@ class PhotoEditorApp(tk.Tk):
                     result = result.filter(ImageFilter.UnsharpMask(radius=2, percent=int(100*sharpen), threshold=3))
 
                 _check_cancel()
-                # Color / Contrast / Gamma
-                result = ImageEnhance.Contrast(result).enhance(float(params.get('contrast', 1.0)))
-                _check_cancel()
-                result = ImageEnhance.Color(result).enhance(float(params.get('color', 1.0)))
-                _check_cancel()
+                # Contrast -> Color -> Gamma: same tone_tail() as the cv2 branch, one
+                # numpy pass instead of two ImageEnhance passes plus a point() round-trip
+                contrast = float(params.get('contrast', 1.0))
+                color = float(params.get('color', 1.0))
                 g = float(params.get('gamma', 1.0))
-                if g != 1.0:
-                    lut = [pow(x/255.0, 1.0/g)*255 for x in range(256)]
-                    result = result.point(lut*3)
+                # identity sliders: leave result as is
+                if contrast != 1.0 or color != 1.0 or g != 1.0:
+                    arr = tone_tail(np.array(as_rgb(result)), contrast, color, g, check_cancel=_check_cancel)
+                    result = Image.fromarray(arr, 'RGB')
             except RuntimeError:
                 raise
             except Exception:
@@ -2667,19 +3438,33 @@ class PhotoEditorApp(tk.Tk):
             """Estimate reasonable parameters from the current image content."""
             # downsample for speed
             try:
-                np_img = np.array(self.img.convert('RGB'))
-                h, w = np_img.shape[:2]
+                # Downscale first, in the image's own mode, and only then convert to RGB
+                # and take the array, so no full-size conversion or copy is made.
+                w, h = self.img.size
                 max_dim = 600
+                thumb = self.img
                 if max(h, w) > max_dim:
                     scale = max_dim / float(max(h, w))
                     new_w = max(1, int(w * scale))
                     new_h = max(1, int(h * scale))
-                    small = np.array(self.img.resize((new_w, new_h), Image.Resampling.LANCZOS).convert('RGB'))
+                    if cv2 is not None:
+                        # integer box reduce in Pillow (no full-size array), then
+                        # INTER_AREA on the small array for the exact size
+                        factor = max(w, h) // max_dim
+                        if factor >= 2:
+                            thumb = thumb.reduce(factor)
+                        small = cv2.resize(np.asarray(as_rgb(thumb)), (new_w, new_h), interpolation=cv2.INTER_AREA)
+                    else:
+                        thumb = thumb.resize((new_w, new_h), Image.Resampling.BILINEAR, reducing_gap=2.0)
+                        small = np.asarray(as_rgb(thumb))
                 else:
-                    small = np_img
+                    small = np.asarray(as_rgb(thumb))
 
                 # grayscale
-                gray = (0.2989 * small[..., 0] + 0.5870 * small[..., 1] + 0.1140 * small[..., 2]).astype('uint8')
+                if cv2 is not None:
+                    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+                else:
+                    gray = small.astype(np.float32).dot(GRAY_WEIGHTS).astype(np.uint8)
 
                 # sharpness via laplacian variance if cv2 available
                 if cv2 is not None:
@@ -2691,11 +3476,7 @@ class PhotoEditorApp(tk.Tk):
                     edges = cv2.Canny(gray, lower, upper)
                     edge_count = int((edges > 0).sum())
                 else:
-                    gx = np.gradient(gray.astype(float), axis=1)
-                    gy = np.gradient(gray.astype(float), axis=0)
-                    grad = np.hypot(gx, gy)
-                    sharpness = float(np.var(grad))
-                    edge_count = int((grad > 50).sum())
+                    sharpness, edge_count = gradient_stats(gray)
 
                 total = float(small.shape[0] * small.shape[1])
                 edge_density = (edge_count / total) * 100.0 if total > 0 else 0.0
@@ -2780,16 +3561,60 @@ class PhotoEditorApp(tk.Tk):
         btn_frame.pack(fill='x', pady=8)
 
         def _preview():
+            # Debounce: a new request cancels the running worker and any pending schedule,
+            # so rapid clicks collapse into one pipeline run 200 ms after the last one
+            if self._preview_cancel is not None:
+                self._preview_cancel.set()
+            if self._preview_after_id is not None:
+                self.after_cancel(self._preview_after_id)
+            self._preview_cancel = threading.Event()
+            self._preview_after_id = self.after(200, _run_preview_actual)
+
+        def _run_preview_actual():
+            self._preview_after_id = None
             p = {k: v.get() for k, v in params.items()}
-            try:
-                preview_img = self._enhancement_pipeline(self.img.copy(), p)
-                self.update_canvas_preview(preview_img)
-                self.status_label.config(text="Previewing enhancement...", foreground=self.accent_primary)
-            except Exception as e:
-                messagebox.showerror('Preview Error', f'Failed to generate preview: {e}')
+            cancel_event = self._preview_cancel
+            src = self.img
+            # Run the pipeline at the size the canvas will show (same fit as
+            # update_canvas_preview, never upscaling) instead of full resolution
+            canvas_w, canvas_h = self._canvas_size()
+            ratio = min((canvas_w - 40) / src.width, (canvas_h - 40) / src.height, 1.0)
+            fit = (max(1, int(src.width * ratio)), max(1, int(src.height * ratio)))
+            self.status_label.config(text="Previewing enhancement...", foreground=self.accent_primary)
+
+            def _bg():
+                try:
+                    small = as_rgb(src)
+                    if fit != small.size:
+                        small = resize_for_display(small, fit)
+                    preview_img = self._enhancement_pipeline(small, p, cancel_event=cancel_event)
+
+                    def _show():
+                        # a newer preview (or the dialog closing) superseded this one
+                        if not cancel_event.is_set():
+                            self.update_canvas_preview(preview_img)
+
+                    self.after(1, _show)
+                except RuntimeError:
+                    # cancelled by a newer request
+                    pass
+                except Exception as e:
+                    self.after(1, lambda e=e: messagebox.showerror('Preview Error', f'Failed to generate preview: {e}'))
+
+            threading.Thread(target=_bg, daemon=True).start()
+
+        def _cancel_preview():
+            if self._preview_cancel is not None:
+                self._preview_cancel.set()
+            if self._preview_after_id is not None:
+                self.after_cancel(self._preview_after_id)
+                self._preview_after_id = None
 
         def _apply_with_progress():
+            """Run the full-resolution pipeline on a worker; input img is read-only, so no copy."""
             p = {k: v.get() for k, v in params.items()}
+            # a late preview must not paint over the applied result
+            _cancel_preview()
 
             # Progress dialog
             prog = tk.Toplevel(dlg)
@@ -2810,11 +3635,12 @@ class PhotoEditorApp(tk.Tk):
             def _bg():
                 try:
                     # pass cancel_event into pipeline
-                    out = self._enhancement_pipeline(self.img.copy(), p, cancel_event=cancel_event)
+                    out = self._enhancement_pipeline(self.img, p, cancel_event=cancel_event)
                     def _finish():
                         try:
                             self.push_history()
-                            self.img = out.copy()
+                            # out is a fresh image (or self.img unchanged); nothing edits it in place
+                            self.img = out
                             self.update_canvas()
                             self.status_label.config(text='Advanced enhancement applied.', foreground=self.success_color)
                         finally:
@@ -2839,7 +3665,7 @@ class PhotoEditorApp(tk.Tk):
 
         ttk.Button(btn_frame, text='Preview', command=_preview).pack(side='left', padx=10)
         ttk.Button(btn_frame, text='Apply (with progress)', command=_apply_with_progress).pack(side='left', padx=10)
-        ttk.Button(btn_frame, text='Cancel', command=lambda: (dlg.destroy(), self.update_canvas())).pack(side='right', padx=10)
+        ttk.Button(btn_frame, text='Cancel', command=lambda: (_cancel_preview(), dlg.destroy(), self.update_canvas())).pack(side='right', padx=10)
 
         # Apply Auto preset initially for convenience
         try:
@@ -2910,4 +3736,4 @@ if __name__ == "__main__":
         app.mainloop()
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        print("Please ensure you have all required dependencies installed: Pillow, numpy, and matplotlib.")
\ No newline at end of file
+        print("Please ensure you have all required dependencies installed: Pillow and numpy.")
\ No newline at end of file
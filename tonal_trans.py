@@ -1,16 +1,53 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk, ImageEnhance, ImageOps
+from PIL import Image, ImageTk
 import numpy as np
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # --- Global Variables and Constants ---
+# Every operation here is a pointwise uint8 -> uint8 map, so the processed image is always
+# original_image_pil mapped through one composed 256-entry table (current_lut). Operations
+# only compose tables; the full-size image is materialized once, by flush_lut().
 original_image_pil = None
-processed_image_pil = None
-img_history = []
+current_lut = None
+# Loaded images are kept at most this large on their longest edge. All operations are
+# point ops, so the working copy loses nothing on screen; saving re-reads the source.
+WORKING_MAX_DIM = 4096
+# (file path, full size) the working image was decoded from, or None
+_source = None
 HISTORY_LIMIT = 10 
-C_LOG = 255 / np.log(1 + 255) # Constant for log transformation to map 255 to 255
+# Undo stack of composed tables (256 bytes each); the deque drops the oldest state itself
+img_history = deque(maxlen=HISTORY_LIMIT)
+IDENTITY_LUT = np.arange(256, dtype=np.uint8)
+NEGATIVE_LUT = 255 - IDENTITY_LUT
+C_LOG = 255 / np.log1p(255) # Constant for log transformation to map 255 to 255
+# uint8 input has only 256 possible values, so s = c * log(1 + r) is precomputed once.
+# r is used directly: the old normalize (/255) and rescale (*255) steps cancelled out.
+LOG_LUT = np.clip(C_LOG * np.log1p(np.arange(256.0)), 0, 255).astype(np.uint8)
+# Power-law lookup tables keyed by rounded gamma (oldest dropped past GAMMA_LUT_LIMIT)
+_GAMMA_LUT_CACHE = {}
+GAMMA_LUT_LIMIT = 32
+# Brightness tables keyed by the slider value rounded to 0.01 (the slider spans 0.1-2.0)
+_BRIGHTNESS_LUT_CACHE = {}
+# (original image, table bytes, full-size processed image) from the last flush_lut()
+_flushed = None
+# Pending after() job and value for the debounced brightness slider
+_bright_job = None
+_bright_value = None
+# Original resized for display: (source image, display size, high quality, resized image)
+_resized_original = None
+# Last render per label: label -> (resized source, table bytes or None, PhotoImage)
+_display_cache = {}
+# What update_images last drew: (original image, frame size, table bytes, high quality)
+_last_render = None
+# Pending after() jobs: debounced <Configure> handler and the settled LANCZOS pass
+_configure_job = None
+_hq_job = None
+# Single worker that decodes image files so the window stays responsive
+_load_executor = ThreadPoolExecutor(max_workers=1)
 
 # --- Robust File Picker (For stability) ---
 
@@ -51,42 +88,95 @@ def pick_file_with_pyside():
 
 def save_state():
     """Saves the current processed image state to the history stack."""
-    global processed_image_pil, img_history
-    if processed_image_pil:
-        # Only save if the new state is different from the last one (simple check)
-        if not img_history or not np.array_equal(np.array(processed_image_pil), np.array(img_history[-1])):
-            if len(img_history) >= HISTORY_LIMIT:
-                img_history.pop(0) # Remove the oldest state
-            img_history.append(processed_image_pil.copy())
+    if current_lut is not None:
+        # Only save if the new state is different from the last one. Tables are never
+        # modified in place (composition builds a new one), so no copy is needed.
+        if not img_history or not np.array_equal(img_history[-1], current_lut):
+            img_history.append(current_lut)
 
 def undo():
     """Restores the previous image state from the history stack."""
-    global processed_image_pil, img_history, original_image_pil
+    global current_lut, img_history
     if len(img_history) > 1:
         # Pop the current state, and restore the state before it
         img_history.pop()
-        processed_image_pil = img_history[-1].copy()
+        current_lut = img_history[-1]
         update_images()
         # messagebox.showinfo("Undo", "Undo successful.")
     elif len(img_history) == 1 and original_image_pil:
         # Restore to the very first loaded image
-        processed_image_pil = original_image_pil.copy()
-        img_history = [processed_image_pil.copy()]
+        current_lut = IDENTITY_LUT
+        img_history = deque([current_lut], maxlen=HISTORY_LIMIT)
         update_images()
         messagebox.showwarning("Reset", "Reverted to original loaded image.")
     else:
         messagebox.showwarning("Warning", "Cannot undo further.")
 
+# --- Lookup Tables ---
+
+def get_gamma_lut(gamma):
+    """Returns the 256-entry uint8 table for s = r^gamma, built once per gamma value."""
+    key = round(gamma, 4)
+    lut = _GAMMA_LUT_CACHE.get(key)
+    if lut is None:
+        # one scratch buffer for the table math; it is only 256 values, so it stays
+        # float64 to match the old per-pixel results exactly
+        levels = np.arange(256.0)
+        levels /= 255.0
+        np.power(levels, key, out=levels)
+        levels *= 255
+        np.clip(levels, 0, 255, out=levels)
+        lut = levels.astype(np.uint8)
+        if len(_GAMMA_LUT_CACHE) >= GAMMA_LUT_LIMIT:
+            # dicts keep insertion order, so the first key is the oldest
+            del _GAMMA_LUT_CACHE[next(iter(_GAMMA_LUT_CACHE))]
+        _GAMMA_LUT_CACHE[key] = lut
+    return lut
+
+def get_brightness_lut(value):
+    """Returns the 256-entry uint8 table for s = r * value, built once per slider step."""
+    key = round(value, 2)
+    lut = _BRIGHTNESS_LUT_CACHE.get(key)
+    if lut is None:
+        lut = np.clip(np.arange(256.0) * key, 0, 255).astype(np.uint8)
+        _BRIGHTNESS_LUT_CACHE[key] = lut
+    return lut
+
+def compose_lut(lut):
+    """Applies lut after the current operations: (lut o current_lut), still one table."""
+    global current_lut
+    current_lut = lut[current_lut]
+
+def flush_lut():
+    """Returns the full-size processed image, mapping the original through current_lut in one pass."""
+    global _flushed
+    if _source is not None and _source[1] != original_image_pil.size:
+        # The working copy was reduced on load; apply the table to the full-resolution file
+        return Image.open(_source[0]).convert("RGB").point(current_lut.tolist() * 3)
+    key = current_lut.tobytes()
+    if _flushed is None or _flushed[0] is not original_image_pil or _flushed[1] != key:
+        # point() takes one 256-entry table per band, so repeat it for R, G and B
+        _flushed = (original_image_pil, key, original_image_pil.point(current_lut.tolist() * 3))
+    return _flushed[2]
+
 # --- Image Display and Utilities ---
 
-def update_images():
-    """Updates the displayed images, resizing them to fit the canvas."""
-    global processed_image_pil, original_image_pil
+def update_images(high_quality=False):
+    """Updates the displayed images, resizing them to fit the canvas.
+
+    Interactive updates resize with BILINEAR; once nothing has changed for 200 ms
+    the images are re-rendered once with LANCZOS.
+    """
+    global _resized_original, _hq_job, _last_render
     
-    if original_image_pil is None or processed_image_pil is None:
+    if original_image_pil is None or current_lut is None:
         return
 
     try:
+        # Minimized/withdrawn windows still get <Configure>; nothing to draw
+        if not tonal_window.winfo_viewable():
+            return
+
         tonal_window.update_idletasks()
         
         frame_width = right_frame.winfo_width()
@@ -95,35 +185,73 @@ def update_images():
         if frame_width < 100 or frame_height < 100:
             return
 
+        # Nothing changed since the last render (at least this quality): skip all work
+        frame_size = (frame_width, frame_height)
+        lut_key = current_lut.tobytes()
+        last = _last_render
+        if (last and last[0] is original_image_pil and last[1] == frame_size
+                and last[2] == lut_key and (last[3] or not high_quality)):
+            return
+
         # Allocate space for both images side-by-side
         max_w = int((frame_width / 2) - 20)
         max_h = int(frame_height - 20)
+
+        img_w, img_h = original_image_pil.size
         
-        # Helper to resize and display
-        def display_image(image_pil, label_widget):
-            img_w, img_h = image_pil.size
-            
-            # Calculate ratio to fit inside max_w x max_h
-            ratio = min(max_w / img_w, max_h / img_h)
-            new_w, new_h = int(img_w * ratio), int(img_h * ratio)
+        # Calculate ratio to fit inside max_w x max_h
+        ratio = min(max_w / img_w, max_h / img_h)
+        new_size = (int(img_w * ratio), int(img_h * ratio))
+
+        # Both panels show the original at this size: resize it once (unless the same
+        # size at least this quality is cached) and map it through the table for the
+        # processed panel, so operations never touch the full-size image here
+        cached = _resized_original
+        if not (cached and cached[0] is original_image_pil and cached[1] == new_size
+                and (cached[2] or not high_quality)):
+            resample = Image.Resampling.LANCZOS if high_quality else Image.Resampling.BILINEAR
+            # reducing_gap first shrinks by an integer factor with a cheap box reduce,
+            # then filters the much smaller image (what thumbnail() does, minus its copy)
+            _resized_original = (original_image_pil, new_size, high_quality,
+                                 original_image_pil.resize(new_size, resample, reducing_gap=3.0))
+        base = _resized_original[3]
+        
+        # Helper to display the resized original, optionally mapped through a table
+        def display_image(label_widget, lut):
+            key = None if lut is None else lut.tobytes()
+            # Same source through the same table is already on screen
+            cached = _display_cache.get(label_widget)
+            if cached and cached[0] is base and cached[1] == key:
+                return
             
-            display_pil = image_pil.resize((new_w, new_h), Image.Resampling.LANCZOS)
+            display_pil = base if lut is None else base.point(lut.tolist() * 3)
             display_tk = ImageTk.PhotoImage(display_pil)
             label_widget.config(image=display_tk, text="")
             label_widget.image = display_tk # Keep a reference
+            _display_cache[label_widget] = (base, key, display_tk)
             
-        display_image(original_image_pil, original_image_label)
-        display_image(processed_image_pil, processed_image_label)
+        display_image(original_image_label, None)
+        display_image(processed_image_label, current_lut)
+        _last_render = (original_image_pil, frame_size, lut_key, high_quality)
+
+        if not high_quality:
+            if _hq_job is not None:
+                tonal_window.after_cancel(_hq_job)
+            _hq_job = tonal_window.after(200, _run_high_quality)
         
     except Exception as e:
         print(f"FATAL ERROR in update_images: {e}")
         # messagebox.showerror("Display Error", "Could not display image properly.")
 
 
+def _run_high_quality():
+    global _hq_job
+    _hq_job = None
+    update_images(high_quality=True)
+
+
 def upload_image():
     """Handles file dialog and loads the selected image, prioritizing a robust file picker."""
-    global original_image_pil, processed_image_pil, img_history
-    
     # 1. Try PySide6 file picker first (more stable on some systems)
     file_path = pick_file_with_pyside()
     
@@ -136,28 +264,65 @@ def upload_image():
             return
             
     if file_path:
-        
-            # Load and convert to RGB for consistent processing
-            new_image = Image.open(file_path).convert("RGB")
-            
-            original_image_pil = new_image.copy()
-            processed_image_pil = new_image.copy()
-            
-            # Initialize history stack with the current image
-            img_history = [processed_image_pil.copy()]
-            
-            # Reset sliders/entries to default state
-            brightness_slider.set(1.0)
-            gamma_entry.delete(0, tk.END)
-            gamma_entry.insert(0, "1.0")
-            
-            update_images()
+        def _loaded(new_image, source):
+            install_image(new_image, source)
             messagebox.showinfo("Success", "Image loaded successfully.")
+
+        load_image_async(file_path, _loaded,
+                         lambda e: messagebox.showerror("Error", f"Failed to load image: {e}"))
+
+def load_image_async(file_path, on_loaded, on_error):
+    """Decodes file_path to RGB on the loader thread; calls on_loaded/on_error on the Tk thread.
+
+    on_loaded receives the working image (at most WORKING_MAX_DIM on its longest edge)
+    and the (file path, full size) it came from.
+    """
+    def _decode():
+        # Load and convert to RGB for consistent processing
+        image = Image.open(file_path).convert("RGB")
+        full_size = image.size
+        # thumbnail() only ever shrinks and keeps the aspect ratio
+        image.thumbnail((WORKING_MAX_DIM, WORKING_MAX_DIM), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        return image, (file_path, full_size)
+
+    future = _load_executor.submit(_decode)
+
+    def _poll():
+        if not future.done():
+            tonal_window.after(50, _poll)
+            return
+        try:
+            new_image, source = future.result()
+        except Exception as e:
+            on_error(e)
+            return
+        on_loaded(new_image, source)
+
+    tonal_window.after(50, _poll)
+
+def install_image(new_image, source=None):
+    """Makes new_image the original image and resets the table, history and controls."""
+    global original_image_pil, current_lut, img_history, _source
+    original_image_pil = new_image
+    _source = source
+    current_lut = IDENTITY_LUT
+    
+    # Initialize history stack with the current (unprocessed) state
+    img_history = deque([current_lut], maxlen=HISTORY_LIMIT)
+    
+    # Reset sliders/entries to default state
+    try:
+        brightness_slider.set(1.0)
+        gamma_entry.delete(0, tk.END)
+        gamma_entry.insert(0, "1.0")
+    except Exception:
+        pass
+    
+    update_images()
         
 def save_image():
     """Saves the current processed image to a user-specified file."""
-    global processed_image_pil
-    if processed_image_pil:
+    if current_lut is not None:
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
             filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg"), ("All files", "*.*")],
@@ -165,7 +330,7 @@ def save_image():
         )
         if file_path:
             try:
-                processed_image_pil.save(file_path)
+                flush_lut().save(file_path)
                 messagebox.showinfo("Success", f"Image successfully saved to:\n{file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save image: {e}")
@@ -175,37 +340,50 @@ def save_image():
 # --- Tonal Transformation Functions ---
 
 def adjust_brightness(value):
-    """Adjusts brightness using PIL ImageEnhance."""
-    global processed_image_pil
+    """Slider callback: coalesces motion so brightness is computed at most every ~30 ms."""
+    global _bright_job, _bright_value
     if original_image_pil is None:
         # messagebox.showwarning("Warning", "No image loaded")
         return
 
+    # Only the latest value matters; intermediate slider positions are dropped
+    _bright_value = value
+    if _bright_job is None:
+        _bright_job = tonal_window.after(30, _do_brightness)
+
+def _do_brightness():
+    """Adjusts brightness by scaling levels (the same s = r * value as ImageEnhance.Brightness)."""
+    global current_lut, _bright_job
+    _bright_job = None
+    if original_image_pil is None:
+        return
+
     try:
-        # We always enhance the current image in the history stack
-        enhancer = ImageEnhance.Brightness(img_history[-1])
-        bright_img = enhancer.enhance(float(value))
-        processed_image_pil = bright_img
+        # We always adjust the current state in the history stack
+        current_lut = get_brightness_lut(float(_bright_value))[img_history[-1]]
         update_images()
     except Exception as e:
         print(f"Brightness error: {e}")
 
 def commit_brightness_change():
     """Saves the current brightness-adjusted image to history when the slider is released."""
-    if processed_image_pil and original_image_pil:
+    if _bright_job is not None:
+        # apply the last slider value before committing it
+        tonal_window.after_cancel(_bright_job)
+        _do_brightness()
+    if current_lut is not None and original_image_pil:
         save_state()
 
 def apply_negative():
     """Applies the image negative transformation (inversion)."""
-    global processed_image_pil
-    if processed_image_pil is None:
+    if current_lut is None:
         messagebox.showwarning("Warning", "No image loaded to process.")
         return
 
     try:
         save_state()
-        # Use ImageOps.invert for a fast, built-in negative operation
-        processed_image_pil = ImageOps.invert(processed_image_pil)
+        # s = 255 - r, composed into the current table
+        compose_lut(NEGATIVE_LUT)
         
         update_images()
         messagebox.showinfo("Success", "Applied Negative (Invert).")
@@ -215,28 +393,15 @@ def apply_negative():
 
 def apply_log_transformation():
     """Applies the log transformation: s = c * log(1 + r)."""
-    global processed_image_pil
-    if processed_image_pil is None:
+    if current_lut is None:
         messagebox.showwarning("Warning", "No image loaded to process.")
         return
 
     try:
         save_state()
         
-        # 1. Convert PIL image to NumPy array (float for math)
-        img_np = np.array(processed_image_pil, dtype=float)
-        
-        # 2. Normalize intensity (0-1) for log calculation
-        normalized_img = img_np / 255.0
-        
-        # 3. Apply log transformation: s = c * log(1 + r)
-        log_transformed = C_LOG * np.log(1 + normalized_img * 255) / 255
-        
-        # 4. Scale back to 0-255 and ensure type is uint8
-        output_img_np = np.clip(log_transformed * 255, 0, 255).astype(np.uint8)
-
-        # 5. Convert back to PIL Image
-        processed_image_pil = Image.fromarray(output_img_np)
+        # s = c * log(1 + r), composed into the current table
+        compose_lut(LOG_LUT)
         
         update_images()
         messagebox.showinfo("Success", "Applied Log Transformation.")
@@ -246,8 +411,7 @@ def apply_log_transformation():
 
 def apply_power_law_transformation():
     """Applies the power-law (gamma) transformation: s = r^gamma."""
-    global processed_image_pil
-    if processed_image_pil is None:
+    if current_lut is None:
         messagebox.showwarning("Warning", "No image loaded to process.")
         return
 
@@ -259,20 +423,8 @@ def apply_power_law_transformation():
 
         save_state()
         
-        # 1. Convert PIL image to NumPy array (float for math)
-        img_np = np.array(processed_image_pil, dtype=float)
-        
-        # 2. Normalize intensity (0-1)
-        normalized_img = img_np / 255.0
-        
-        # 3. Apply Power Law (Gamma) transformation
-        gamma_transformed = normalized_img ** gamma
-        
-        # 4. Scale back to 0-255 and ensure type is uint8
-        output_img_np = np.clip(gamma_transformed * 255, 0, 255).astype(np.uint8)
-
-        # 5. Convert back to PIL Image
-        processed_image_pil = Image.fromarray(output_img_np)
+        # Power Law (Gamma) transformation, composed into the current table
+        compose_lut(get_gamma_lut(gamma))
         
         update_images()
         messagebox.showinfo("Success", f"Applied Power Law (Gamma={gamma}).")
@@ -370,26 +522,29 @@ power_law_button = ttk.Button(left_frame, text="Apply Gamma", command=apply_powe
 power_law_button.pack(pady=10, padx=10, fill='x')
 
 
-# Bind resizing event to update images
-tonal_window.bind('<Configure>', lambda e: tonal_window.after_idle(update_images))
+def on_configure(event):
+    """Debounces <Configure>: re-render once the window has been still for 50 ms."""
+    global _configure_job
+    if _configure_job is not None:
+        tonal_window.after_cancel(_configure_job)
+    _configure_job = tonal_window.after(50, _run_configure)
+
+def _run_configure():
+    global _configure_job
+    _configure_job = None
+    update_images()
+
+# Bind resizing event to update images; <Map> covers restores and first mapping, which
+# don't reliably fire <Configure> (update_images skips drawing while unviewable)
+tonal_window.bind('<Configure>', on_configure)
+tonal_window.bind('<Map>', on_configure)
 
-# If an image path was supplied as the first CLI argument, preload it so the UI shows it immediately.
+# If an image path was supplied as the first CLI argument, preload it. Decoding runs on the
+# loader thread, so the window appears immediately and the image shows up once ready.
 if len(sys.argv) > 1:
-    try:
-        p = Path(sys.argv[1])
-        if p.exists():
-            new_image = Image.open(p).convert("RGB")
-            original_image_pil = new_image.copy()
-            processed_image_pil = new_image.copy()
-            img_history = [processed_image_pil.copy()]
-            try:
-                brightness_slider.set(1.0)
-                gamma_entry.delete(0, tk.END)
-                gamma_entry.insert(0, "1.0")
-            except Exception:
-                pass
-            update_images()
-    except Exception as e:
-        messagebox.showwarning("Preload Warning", f"Failed to preload image: {e}")
+    p = Path(sys.argv[1])
+    if p.exists():
+        load_image_async(p, install_image,
+                         lambda e: messagebox.showwarning("Preload Warning", f"Failed to preload image: {e}"))
 
 tonal_window.mainloop()
\ No newline at end of file